@@ -10,6 +10,7 @@ from casadi import SX, Function, vertcat, inf, nlpsol
 from PSF.utils import nonlinear_to_linear, create_system_set, center_optimization, lift_constrain, \
     move_system, row_scale, col_scale, robust_ellipsoid, polytope_center, max_ellipsoid, NLP_OPTS, plotEllipsoid, \
     stack_Hh, ellipsoid_volume, get_terminal_set
+from PSF.polytope import minimal_representation
 
 ERROR_F_VALUE = 10e4
 WARNING_F_VALUE = 10e2
@@ -48,9 +49,15 @@ class PSF:
                  param=None,
                  alpha=0.9,
                  slew_rate=None,
-                 terminal_type="fake"
+                 terminal_type="fake",
+                 verify=False
                  ):
+        """
+        verify: Check the terminal set with the Monte-Carlo simulation of PSF.verification.verify_terminal_set,
+            which takes seconds. The default "fake" terminal sets are not invariant and always fail the check.
+        """
         self.terminal_type = terminal_type
+        self.verify = verify
         self.sys = sys
         self.t_sys = t_sys
 
@@ -111,6 +118,15 @@ class PSF:
 
         self.P, self.K, self.x_c0, self.u_c0 = terminal_set
 
+        if self.verify:
+            from PSF.verification import verify_terminal_set
+
+            verification = verify_terminal_set(self.sys, self.P, self.K, self.x_c0, self.u_c0, alpha=self.alpha)
+            logging.info(f"Terminal set verification: {verification}")
+            if verification["violation_fraction"] > 0:
+                logging.warning(f"Terminal set is not invariant for "
+                                f"{verification['violation_fraction']:.2%} of the verification samples.")
+
     def get_RK_model_step(self):
         M = 4  # RK4 steps per interval
 
@@ -160,6 +176,9 @@ class PSF:
 
         u_prev = SX.sym('u_prev', self.nu, 1)
 
+        Hx, hx = minimal_representation(self.sys["Hx"], self.sys["hx"])
+        Hu, hu = minimal_representation(self.sys["Hu"], self.sys["hu"])
+
         objective = self.get_objective(U=U, u_ref=u_ref)
 
         # empty problem
@@ -191,9 +210,9 @@ class PSF:
 
             # Composite Input constrains
 
-            g += [self.sys["Hu"] @ U[:, i]]
+            g += [Hu @ U[:, i]]
             self.lbg += [-inf] * g[-1].shape[0]
-            self.ubg += [self.sys["hu"]]
+            self.ubg += [hu]
 
             if self.slew_rate is not None:
                 g += [U[:, i] - U[:, i - 1]]
@@ -204,9 +223,9 @@ class PSF:
             w0 += [x0]
 
             # Composite State constrains
-            g += [self.sys["Hx"] @ X[:, i + 1]]
+            g += [Hx @ X[:, i + 1]]
             self.lbg += [-inf] * g[-1].shape[0]
-            self.ubg += [self.sys["hx"]]
+            self.ubg += [hx]
 
             g += [X[:, i + 1] - self.model_step(xk=X[:, i], u=U[:, i], p=p, dt=self.dt[i])['xf']]
 
@@ -240,6 +259,12 @@ class PSF:
     def reset_init_guess(self):
         self._init_guess = np.array([])
 
+    def get_init_guess(self):
+        return self._init_guess.copy()
+
+    def set_init_guess(self, init_guess):
+        self._init_guess = np.asarray(init_guess).copy()
+
     def calculate_new_terminal(self, new_t_sys):
         self.t_sys = new_t_sys
         self.set_terminal_set()
@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+import numpy as np
+from casadi import Function, jacobian
+
+
+def quantize(z, digits=6):
+    """
+    Rounds every element of z to digits significant digits.
+    """
+    z = np.asarray(z, dtype=float).reshape(-1)
+    scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(np.where(z == 0, 1, z)))))
+    return np.round(z * scale) / scale
+
+
+class Linearization:
+    """
+    Numeric linearization x_dot = A x + B u + g of x_dot(x, u, p) around operating points (x, u, p).
+    The Jacobian Function is compiled once. Single points are cached in an LRU cache keyed by the point rounded to
+    digits significant digits, and evaluated at that rounded point, so a cached result does not depend on which
+    nearby point was asked for first.
+    """
+
+    def __init__(self, x_dot, x, u, p, digits=6, maxsize=4096):
+        A = jacobian(x_dot, x)
+        B = jacobian(x_dot, u)
+        g = x_dot - A @ x - B @ u
+        self.nx = x.shape[0]
+        self.nu = u.shape[0]
+        self.np = p.shape[0]
+        self.digits = digits
+        self.function = Function("linearization", [x, u, p], [A, B, g], ["x", "u", "p"], ["A", "B", "g"])
+        self._evaluate_cached = lru_cache(maxsize=maxsize)(self._evaluate_key)
+        self._mapped = {}
+
+    def _evaluate_key(self, key):
+        z = np.asarray(key)
+        A, B, g = self.function(z[:self.nx], z[self.nx:self.nx + self.nu], z[self.nx + self.nu:])
+        A, B, g = np.asarray(A), np.asarray(B), np.asarray(g)
+        for arr in (A, B, g):
+            arr.setflags(write=False)
+        return A, B, g
+
+    def __call__(self, x, u, p):
+        """
+        Returns:
+            A: (nx, nx) array.
+            B: (nx, nu) array.
+            g: (nx, 1) array.
+        """
+        z = np.hstack([np.asarray(x, dtype=float).reshape(-1),
+                       np.asarray(u, dtype=float).reshape(-1),
+                       np.asarray(p, dtype=float).reshape(-1)])
+        return tuple(arr.copy() for arr in self._evaluate_cached(tuple(quantize(z, self.digits))))
+
+    def batch(self, X, U, P):
+        """
+        Linearizes at the n operating points in the rows of X (n, nx), U (n, nu) and P (n, np), without the cache.
+        Returns:
+            A: (n, nx, nx) array.
+            B: (n, nx, nu) array.
+            g: (n, nx) array.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, self.nx)
+        U = np.asarray(U, dtype=float).reshape(-1, self.nu)
+        P = np.asarray(P, dtype=float).reshape(-1, self.np)
+        n = X.shape[0]
+        if n not in self._mapped:
+            self._mapped[n] = self.function.map(n)
+        A, B, g = self._mapped[n](X.T, U.T, P.T)
+        # The mapped Function concatenates the n results horizontally
+        A = np.asarray(A).reshape(self.nx, n, self.nx).transpose(1, 0, 2)
+        B = np.asarray(B).reshape(self.nx, n, self.nu).transpose(1, 0, 2)
+        return A, B, np.asarray(g).T
+
+    def cache_info(self):
+        return self._evaluate_cached.cache_info()
+
+    def cache_clear(self):
+        self._evaluate_cached.cache_clear()
@@ -0,0 +1,163 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+def _key(H, h):
+    H = np.ascontiguousarray(H, dtype=float)
+    h = np.ascontiguousarray(h, dtype=float).reshape(-1)
+    return H.tobytes(), h.tobytes(), H.shape
+
+
+def _from_key(H_bytes, h_bytes, shape):
+    return np.frombuffer(H_bytes).reshape(shape), np.frombuffer(h_bytes)
+
+
+def _linprog(c, H, h):
+    from scipy.optimize import linprog
+    res = linprog(c, A_ub=H, b_ub=h, bounds=[(None, None)] * len(c), method="highs")
+    if res.status == 2:
+        raise ValueError("Polytope is empty")
+    if res.status == 3:
+        raise ValueError("Polytope is unbounded")
+    if res.status != 0:
+        raise RuntimeError(res.message)
+    return res
+
+
+@lru_cache(maxsize=None)
+def _bounding_box(H_bytes, h_bytes, shape):
+    H, h = _from_key(H_bytes, h_bytes, shape)
+    nz = shape[-1]
+    box = np.zeros((nz, 2))
+    for i in range(nz):
+        c = np.zeros(nz)
+        c[i] = 1
+        box[i, 0] = _linprog(c, H, h).fun
+        box[i, 1] = -_linprog(-c, H, h).fun
+    box.setflags(write=False)
+    return box
+
+
+def bounding_box(Hz, hz):
+    """
+    Smallest axis aligned box containing {z | Hz z <= hz}, as rows of [lower, upper].
+    Solved as 2*nz LPs and cached on the constraint matrices.
+    """
+    return _bounding_box(*_key(Hz, hz)).copy()
+
+
+@lru_cache(maxsize=None)
+def _chebyshev_center(H_bytes, h_bytes, shape):
+    H, h = _from_key(H_bytes, h_bytes, shape)
+    nz = shape[-1]
+    norm = np.linalg.norm(H, axis=1, keepdims=True)
+    c = np.zeros(nz + 1)
+    c[-1] = -1
+    res = _linprog(c, np.hstack([H, norm]), h)
+    center = res.x[:-1]
+    center.setflags(write=False)
+    return center
+
+
+def chebyshev_center(Hz, hz):
+    """
+    Center of the largest ball inscribed in {z | Hz z <= hz}.
+    """
+    return _chebyshev_center(*_key(Hz, hz)).copy()
+
+
+def _sample_box(H, h, lo, hi, n, rng):
+    samples = np.empty((0, H.shape[-1]))
+    acceptance = 1.0
+    while samples.shape[0] < n:
+        missing = n - samples.shape[0]
+        batch = rng.uniform(lo, hi, size=(int(np.ceil(1.2 * missing / acceptance)) + 1, lo.shape[0]))
+        inside = (batch @ H.T <= h).all(axis=1)
+        acceptance = max(inside.mean(), 1e-3)
+        samples = np.vstack([samples, batch[inside]])
+    return samples[:n]
+
+
+def _sample_hit_and_run(H, h, lo, hi, n, rng, steps):
+    # Walk in box normalized coordinates, so badly scaled polytopes mix as well as the unit cube
+    free = hi > lo
+    span = np.where(free, hi - lo, 1)
+    Hy = H * span
+    hy = h - H @ lo
+    y = np.tile((chebyshev_center(Hz=H, hz=h) - lo) / span, (n, 1))
+    for _ in range(steps):
+        d = rng.standard_normal(y.shape) * free
+        d /= np.linalg.norm(d, axis=1, keepdims=True)
+        Hd = d @ Hy.T
+        slack = np.maximum(hy - y @ Hy.T, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = slack / Hd
+        t_max = np.where(Hd > 0, t, np.inf).min(axis=1)
+        t_min = np.where(Hd < 0, t, -np.inf).max(axis=1)
+        y += rng.uniform(t_min, t_max)[:, None] * d
+    return lo + y * span
+
+
+def sample_polytope(Hz, hz, n=1, rng=None, method="box", steps=None):
+    """
+    Draws n uniform samples from the bounded polytope {z | Hz z <= hz}.
+    Parameters:
+        Hz, hz: H-representation of the polytope.
+        n: int. Number of samples.
+        rng: np.random.Generator, seed or None.
+        method: "box" for rejection sampling from the bounding box (exact, best for near box shaped sets),
+            or "hit_and_run" for n parallel hit-and-run chains (for thin sets with low box acceptance).
+        steps: int. Number of hit-and-run steps per chain, defaults to 10 * nz.
+    Returns:
+        samples: (n, nz) array.
+    """
+    rng = np.random.default_rng(rng)
+    H = np.asarray(Hz, dtype=float)
+    h = np.asarray(hz, dtype=float).reshape(-1)
+    box = bounding_box(H, h)
+    lo, hi = box[:, 0], box[:, 1]
+
+    if method == "box":
+        return _sample_box(H, h, lo, hi, n, rng)
+    elif method == "hit_and_run":
+        if steps is None:
+            steps = 10 * H.shape[-1]
+        return _sample_hit_and_run(H, h, lo, hi, n, rng, steps)
+    else:
+        raise ValueError(f"{method} is not a implemented method")
+
+
+@lru_cache(maxsize=None)
+def _minimal_representation(H_bytes, h_bytes, shape, tol):
+    H, h = _from_key(H_bytes, h_bytes, shape)
+    norm = np.linalg.norm(H, axis=1)
+    trivial = norm == 0
+    if (h[trivial] < 0).any():
+        raise ValueError("Polytope is empty")
+    H = H[~trivial] / norm[~trivial, None]
+    h = h[~trivial] / norm[~trivial]
+
+    keep = np.ones(h.shape[0], dtype=bool)
+    for i in range(h.shape[0]):
+        keep[i] = False
+        # Row i is redundant if the others already bound H_i z by h_i. It is relaxed rather than dropped so the LP
+        # stays bounded.
+        res = _linprog(-H[i], np.vstack([H[keep], H[i]]), np.hstack([h[keep], h[i] + 1]))
+        keep[i] = -res.fun > h[i] + tol * max(1, abs(h[i]))
+
+    H, h = H[keep], h[keep]
+    H.setflags(write=False)
+    h.setflags(write=False)
+    return H, h
+
+
+def minimal_representation(Hz, hz, tol=1e-9):
+    """
+    Removes redundant half-spaces from {z | Hz z <= hz} and normalizes the remaining rows to unit length.
+    Redundancy is checked with one LP per row, and the result is cached on the constraint matrices.
+    Returns:
+        Hz, hz: minimal H-representation, hz with the same number of dimensions as the input.
+    """
+    H, h = _minimal_representation(*_key(Hz, hz), tol)
+    return H.copy(), h.reshape((-1,) + np.shape(hz)[1:]).copy()
@@ -5,8 +5,8 @@ from pathlib import Path
 
 import numpy as np
 from casadi import vertcat, SX, nlpsol, inf, MX, rootfinder, Function, horzcat, jacobian
-from scipy.linalg import block_diag
-import cvxpy as cp
+
+from PSF.polytope import bounding_box, sample_polytope, minimal_representation
 
 NLP_OPTS = {
     "warn_initial_bounds": True,
@@ -20,20 +20,11 @@ NLP_OPTS = {
 
 
 def outer_box(Hz, hz):
-    z = SX.sym('z', Hz.shape[-1])
-    box = np.zeros((z.shape[0], 2))
-    for i in range(z.shape[0]):
-        box[i] = delta_range(z[i], z, Hz, hz)
-
-    return box
+    return bounding_box(Hz, hz)
 
 
-def sample_inside_polytope(Hz, hz):
-    box = outer_box(Hz, hz)
-    sample = np.vstack(np.random.default_rng().uniform(box[:, 0], box[:, 1]))
-    while any(Hz @ sample > hz):
-        sample = np.random.default_rng().uniform(box[:, 0], box[:, 1])
-    return sample
+def sample_inside_polytope(Hz, hz, rng=None):
+    return np.vstack(sample_polytope(Hz, hz, rng=rng)[0])
 
 
 def polytope_center(Hz, hz):
@@ -311,21 +302,21 @@ def create_system_set(A, B, v, Hv, hv, full=True):
             delta_bounds[delta_str] = delta_range(v[i], v, Hv, hv)
             delta.append(v[i])
         eval_func = Function("eval_func", delta, [AB])
-    A_set = []
-    B_set = []
-
-    for product in itertools.product(*delta_bounds.values()):  # creating maximum difference
-        AB_extreme = np.asarray(eval_func(*product))
 
-        A_set.append(AB_extreme[:, :nx])
-        B_set.append(AB_extreme[:, nx:])
+    # All combinations of the extremes, evaluated with one mapped call
+    products = np.array(list(itertools.product(*delta_bounds.values())))
+    n = products.shape[0]
+    AB_extreme = np.asarray(eval_func.map(n)(*products.T))
+    AB_extreme = AB_extreme.reshape(AB.shape[0], n, AB.shape[1]).transpose(1, 0, 2)
 
-    return np.stack(A_set), np.stack(B_set)
+    return AB_extreme[:, :, :nx], AB_extreme[:, :, nx:]
 
 
 def max_ellipsoid(Hx, hx, x_0=None):
+    import cvxpy as cp
     if x_0 is not None:
         Hx, hx = move_constraint(Hx, hx, x_0)
+    Hx, hx = minimal_representation(Hx, hx)
     nx = Hx.shape[-1]
     E = cp.Variable((nx, nx), symmetric=True)
     objective = -cp.log_det(E)
@@ -342,6 +333,9 @@ def max_ellipsoid(Hx, hx, x_0=None):
 
 
 def robust_ellipsoid(A_set_list, B_set_list, Hx, Hu, hx, hu):
+    import cvxpy as cp
+    Hx, hx = minimal_representation(Hx, hx)
+    Hu, hu = minimal_representation(Hu, hu)
     nx = Hx.shape[-1]
     nu = Hu.shape[-1]
     E = cp.Variable((nx, nx), symmetric=True)
@@ -413,6 +407,7 @@ def Hh_from_disconnected_constraints(arr):
 
 
 def stack_Hh(H_list, h_list):
+    from scipy.linalg import block_diag
     return block_diag(*H_list), np.vstack(h_list)
 
 
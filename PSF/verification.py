@@ -0,0 +1,108 @@
+import numpy as np
+from casadi import Function, SX
+
+from PSF.polytope import sample_polytope
+
+
+def sample_ellipsoid(P, x_c0, alpha=1.0, n=1000, boundary_fraction=0.5, rng=None):
+    """
+    Samples the ellipsoid {x | (x - x_c0)^T P (x - x_c0) <= alpha}.
+    A boundary_fraction of the samples lie on the surface, the rest are uniform in the interior.
+    Returns:
+        samples: (n, nx) array.
+    """
+    rng = np.random.default_rng(rng)
+    nx = P.shape[0]
+    z = rng.standard_normal((n, nx))
+    z /= np.linalg.norm(z, axis=1, keepdims=True)
+    n_boundary = int(round(boundary_fraction * n))
+    z[n_boundary:] *= rng.random((n - n_boundary, 1)) ** (1 / nx)
+
+    L = np.linalg.cholesky(P)
+    # P = L L^T, so x = x_c0 + sqrt(alpha) L^-T z gives (x - x_c0)^T P (x - x_c0) = alpha |z|^2
+    return np.asarray(x_c0).reshape(1, nx) + np.sqrt(alpha) * np.linalg.solve(L.T, z.T).T
+
+
+def get_batched_RK_step(sys, n, M=4):
+    """
+    Closed loop RK4 step of sys["xdot"] with u = K (x - x_c0) + u_c0, mapped over n columns.
+    """
+    nx = sys["x"].shape[0]
+    nu = sys["u"].shape[0]
+    n_p = sys["p"].shape[0]
+    f = Function('f', [sys["x"], sys["u"], sys["p"]], [sys["xdot"]])
+
+    Xk = SX.sym('Xk', nx)
+    K = SX.sym('K', nu, nx)
+    x_c0 = SX.sym('x_c0', nx)
+    u_c0 = SX.sym('u_c0', nu)
+    P = SX.sym('P', n_p)
+    DT = SX.sym('dt')
+
+    U = K @ (Xk - x_c0) + u_c0
+    X_next = Xk
+    for j in range(M):
+        k1 = f(X_next, U, P)
+        k2 = f(X_next + DT / M / 2 * k1, U, P)
+        k3 = f(X_next + DT / M / 2 * k2, U, P)
+        k4 = f(X_next + DT / M * k3, U, P)
+        X_next = X_next + DT / M / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    step = Function('F', [Xk, P, K, x_c0, u_c0, DT], [X_next, U], ['xk', 'p', 'K', 'x_c0', 'u_c0', 'dt'], ['xf', 'u'])
+    return step.map(n)
+
+
+def verify_terminal_set(sys, P, K, x_c0, u_c0, alpha=1.0, n_samples=10000, T=10, dt=0.1, boundary_fraction=0.5,
+                        tol=1e-9, rng=None):
+    """
+    Monte-Carlo check that the terminal set (P, K, x_c0, u_c0) is invariant for the nonlinear sys["xdot"].
+    Samples on and inside the ellipsoid are simulated for T seconds under the terminal controller,
+    each with a constant parameter drawn uniformly from {p | Hp p <= hp}.
+    Returns:
+        dict with
+            violation_fraction: share of samples leaving the ellipsoid or violating Hx/Hu at any time step.
+            set_violation_fraction, state_violation_fraction, input_violation_fraction: the same per cause.
+            worst_margin: min over samples and time steps t >= dt of (alpha - V(x_t)) / alpha.
+            n_samples: number of samples.
+    """
+    rng = np.random.default_rng(rng)
+    P = np.asarray(P)
+    K = np.asarray(K)
+    x_c0 = np.asarray(x_c0).reshape(-1, 1)
+    u_c0 = np.asarray(u_c0).reshape(-1, 1)
+    n_steps = int(round(T / dt))
+
+    X = sample_ellipsoid(P, x_c0, alpha, n_samples, boundary_fraction, rng).T
+    p = sample_polytope(sys["Hp"], sys["hp"], n_samples, rng=rng).T
+    step = get_batched_RK_step(sys, n_samples)
+
+    set_violation = np.zeros(n_samples, dtype=bool)
+    state_violation = np.zeros(n_samples, dtype=bool)
+    input_violation = np.zeros(n_samples, dtype=bool)
+    worst_margin = np.inf
+    for _ in range(n_steps):
+        X_next, U = step(X, p, K, x_c0, u_c0, dt)
+        X_next = np.asarray(X_next)
+        U = np.asarray(U)
+        with np.errstate(invalid="ignore", over="ignore"):
+            # Diverged trajectories give inf/NaN, which count as violations
+            input_violation |= ~(sys["Hu"] @ U <= sys["hu"]).all(axis=0)
+            state_violation |= ~(sys["Hx"] @ X_next <= sys["hx"]).all(axis=0)
+
+            X_shifted = X_next - x_c0
+            V = np.einsum('in,ij,jn->n', X_shifted, P, X_shifted)
+            margin = (alpha - V) / alpha
+        set_violation |= ~(margin >= -tol)
+        margin[np.isnan(margin)] = -np.inf
+        worst_margin = min(worst_margin, margin.min())
+        X = X_next
+
+    violation = set_violation | state_violation | input_violation
+    return {
+        'violation_fraction': violation.mean(),
+        'set_violation_fraction': set_violation.mean(),
+        'state_violation_fraction': state_violation.mean(),
+        'input_violation_fraction': input_violation.mean(),
+        'worst_margin': worst_margin,
+        'n_samples': n_samples,
+    }
@@ -4,12 +4,13 @@ import matplotlib.pyplot as plt
 import numpy as np
 from PSF.PSF import PSF
 from gym_rl_mpc import DEFAULT_CONFIG
+from gym_rl_mpc.utils.crash_logger import merge_crash_logs
 
 import gym_rl_mpc.objects.symbolic_model as sym
 import gym_rl_mpc.utils.model_params as params
 
 PI = 3.14
-df = pd.read_csv(Path("logs", "debug", "crash_data.csv"))
+df = merge_crash_logs()
 
 states = ["theta", "theta_dot", "omega"]
 p=[ "wind_speed", "adjusted_wind_speed"]
@@ -1,11 +1,20 @@
+import os
+
 from gym.envs.registration import register
 
 from gym_rl_mpc.utils.model_params import RAD2DEG, RAD2RPM, RPM2RAD, DEG2RAD
 
 DEFAULT_CONFIG = {
     "use_psf": False,
+    "turbine_backend": "python",                # "python" (generated code) or "casadi" evaluation of the dynamics
     "step_size": 0.1,
+    "decision_interval": 1,                     # Time-steps each agent action is held for, one PSF solve per decision
+    "integration_tol": None,                    # None for one RK45 step per step_size, else adaptive sub-stepping
+    "recording_level": "full",                  # "none", "summary" (episode averages) or "full" (every step)
+    "history_length": 1000,                     # Episodes kept in total_history, older ones are spilled or dropped
+    "history_spill_dir": None,                  # Folder the older episodes are spilled to, None to drop them
     "max_episode_time": 300,                    # Max time for episode [seconds]
+    "reward": "V-7",                            # Name in gym_rl_mpc.utils.reward.REWARD_VERSIONS or dict of weights
     "crash_reward": -1000,
     "crash_angle_condition": 10*DEG2RAD,
     "crash_omega_max": 10*RPM2RAD,
@@ -27,9 +36,17 @@ DEFAULT_CONFIG = {
 
 VARIABLE_WIND_CONFIG = DEFAULT_CONFIG.copy()
 VARIABLE_WIND_CONFIG["wind_period"] = 60
+VARIABLE_WIND_CONFIG["turbulence_spectrum"] = None     # None, "kaimal" or "von_karman"
+VARIABLE_WIND_CONFIG["turbulence_intensity"] = 0.1
+VARIABLE_WIND_CONFIG["gust_amplitude"] = 0              # Amplitude of one extreme operating gust per episode, 0 for none
 VARIABLE_WIND_CONFIG.pop('max_wind_speed')
 VARIABLE_WIND_CONFIG.pop('min_wind_speed')
 
+RECORDED_WIND_CONFIG = DEFAULT_CONFIG.copy()
+RECORDED_WIND_CONFIG["wind_file"] = os.path.join("wind_records", "wind_speed.npy")  # 1d array of wind speeds
+RECORDED_WIND_CONFIG["wind_file_step_size"] = 1     # Time between the samples of wind_file [seconds]
+RECORDED_WIND_CONFIG["min_wind_speed"] = 3
+
 CRAZY_ENV_CONFIG = VARIABLE_WIND_CONFIG.copy()
 CRAZY_ENV_CONFIG["action_space_increase"] = 3 # Violation will happen with N/N+1 and with size N-1 outside
 
@@ -99,6 +116,10 @@ SCENARIOS = {
         'entry_point': 'gym_rl_mpc.envs:VariableWindPSFtestManual',
         'config': VARIABLE_WIND_CONFIG
     },
+    'RecordedWind-v17': {
+        'entry_point': 'gym_rl_mpc.envs:RecordedWind',
+        'config': RECORDED_WIND_CONFIG
+    },
     'CrazyAgent-v17': {
         'entry_point': 'gym_rl_mpc.envs:CrazyAgent',
         'config': CRAZY_ENV_CONFIG
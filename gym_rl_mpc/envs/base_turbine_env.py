@@ -1,3 +1,4 @@
+import copy
 from abc import ABC, abstractmethod
 from pathlib import Path
 
@@ -7,16 +8,21 @@ from gym.utils import seeding
 
 import gym_rl_mpc.objects.symbolic_model as sym
 import gym_rl_mpc.utils.model_params as params
-from PSF.PSF import PSF
+from gym_rl_mpc.utils.crash_logger import CrashLogger
+from gym_rl_mpc.utils.history import EpisodeHistory
 from gym_rl_mpc.utils.model_params import RAD2DEG, RAD2RPM, DEG2RAD
-import os
-from pandas import DataFrame
+from gym_rl_mpc.utils.recorder import EpisodeRecorder
+from gym_rl_mpc.utils.reward import Reward
 
 
 class BaseTurbineEnv(gym.Env, ABC):
     """
     Creates an environment with a turbine.
     """
+    # Attributes that change during an episode and are kept in the snapshots of get_state
+    snapshot_attributes = ['episode', 'total_t_steps', 't_step', 'cumulative_reward', 'last_reward', 'crashed',
+                           'psf_error', 'crash_cause', 'wind_speed', 'prev_wind_speed', 'observation',
+                           'reward_components', 'agent_action', 'psf_action', 'episode_saved']
 
     def __init__(self, env_config):
         print('Initializing environment...')
@@ -25,6 +31,13 @@ class BaseTurbineEnv(gym.Env, ABC):
 
         self.config = env_config
 
+        if int(self.decision_interval) != self.decision_interval or self.decision_interval < 1:
+            raise ValueError(f"decision_interval must be a positive integer, not {self.decision_interval}")
+        # The first interval of the PSF horizon is one decision, the other N - 1 share the rest of psf_T
+        if self.use_psf and self.step_size * self.decision_interval >= self.psf_T:
+            raise ValueError(f"A decision of decision_interval*step_size = {self.step_size * self.decision_interval}"
+                             f" s must be shorter than the PSF horizon psf_T = {self.psf_T} s")
+
         action_low = np.array(
             [
                 -1,  # Scaled F_thr
@@ -66,54 +79,87 @@ class BaseTurbineEnv(gym.Env, ABC):
 
         self.observation_space = gym.spaces.Box(low=obsv_low, high=obsv_high, dtype=np.float32)
 
-        sys_lub_x = sym.sys_lub_x
+        # The omega bounds only apply to the PSF, the model constraints of sym are shared by all envs
+        sys_lub_x = sym.sys_lub_x.copy()
         sys_lub_x[2] = np.asarray([self.psf_lb_omega, self.psf_ub_omega])
 
-        T = self.psf_T
-        N = T*2
-        sys = sym.get_sys(sys_lub_x)
-
-        t_sys = sym.get_terminal_sys()
-        R = np.diag(
-            [
-                1 / params.max_thrust_force ** 2,
-                1 / params.max_blade_pitch ** 2,
-                1 / params.max_power_generation ** 2
-            ])
-        actuation_max_rate = [params.max_thrust_rate, params.max_blade_pitch_rate, params.max_power_rate]
-
-        ## PSF init ##
-        self.psf = PSF(sys=sys, N=N, T=T, t_sys=t_sys, R=R, PK_path=Path("PSF", "stored_PK"),#slew_rate=actuation_max_rate,
-                       ext_step_size=self.step_size)
-
-        ## END PSF init ##
+        # Built on first use, so envs without PSF never compute the terminal set or the nlpsol
+        self._psf = None
+        self._psf_sys_lub_x = sys_lub_x
 
         self.episode = 0
         self.total_t_steps = 0
         self.t_step = 0
         self.cumulative_reward = 0
 
-        self.total_history = []
+        # The latest episodes, older ones are spilled to history_spill_dir
+        self.total_history = EpisodeHistory(self.history_length, self.history_spill_dir)
         self.history = {}
 
         self.crashed = None
         self.last_reward = None
+        self.episode_saved = False
+
+        self.reward_function = Reward(self.reward, env_config)
+        self.reward_components = {}
+
+        # Created on the first crash with PSF
+        self.crash_logger = None
+
+        # Episodes end when t_step >= max_episode_time / step_size, so they have at most one step more
+        self.recorder = EpisodeRecorder(int(np.ceil(self.max_episode_time / self.step_size)) + 1,
+                                        level=self.recording_level)
 
         self.rand_num_gen = None
         self.seed()
 
+    @property
+    def psf(self):
+        if self._psf is None:
+            self._psf = self.make_psf()
+        return self._psf
+
+    @psf.setter
+    def psf(self, psf):
+        self._psf = psf
+
+    def make_psf(self):
+        """
+        Creates the PSF of the env, can be overridden to share or inject a filter.
+        """
+        T = self.psf_T
+        N = T*2
+        sys = sym.get_sys(self._psf_sys_lub_x)
+
+        t_sys = sym.get_terminal_sys()
+        R = np.diag(
+            [
+                1 / params.max_thrust_force ** 2,
+                1 / params.max_blade_pitch ** 2,
+                1 / params.max_power_generation ** 2
+            ])
+        actuation_max_rate = [params.max_thrust_rate, params.max_blade_pitch_rate, params.max_power_rate]
+
+        from PSF.PSF import PSF
+
+        # The first interval of the horizon is the decision the PSF action is held for
+        return PSF(sys=sys, N=N, T=T, t_sys=t_sys, R=R, PK_path=Path("PSF", "stored_PK"),#slew_rate=actuation_max_rate,
+                   ext_step_size=self.step_size * self.decision_interval)
+
     def reset(self):
         """
         Resets environment to initial state.
         """
-        self.psf.reset_init_guess()
+        if self._psf is not None:
+            self._psf.reset_init_guess()
         # Seeding
         if self.rand_num_gen is None:
             self.seed()
 
-        # Saving information about episode
-        if self.t_step:
+        # Saving information about episode, if it was not saved when it ended
+        if self.t_step and not self.episode_saved:
             self.save_latest_episode()
+        self.episode_saved = False
 
         # Incrementing counters
         self.episode += 1
@@ -127,7 +173,7 @@ class BaseTurbineEnv(gym.Env, ABC):
         self.psf_error = False
         self.crash_cause = -1
 
-        self.episode_history = {}
+        self.recorder.reset()
 
         self.generate_environment()
         self.observation = self.observe()
@@ -136,8 +182,11 @@ class BaseTurbineEnv(gym.Env, ABC):
 
     def step(self, action):
         """
-        Simulates the environment one time-step.
+        Simulates the environment one decision: the action is held for decision_interval time-steps and the PSF
+        is solved once at the start of the decision. The reward is the sum over the time-steps.
         """
+        self.update_wind()
+        applied_action = action
 
         if self.use_psf:
             F_thr = action[0] * params.max_thrust_force
@@ -159,34 +208,54 @@ class BaseTurbineEnv(gym.Env, ABC):
                                         psf_corrected_action_un_normalized[1] / params.max_blade_pitch,
                                         psf_corrected_action_un_normalized[2] / params.max_power_generation]
                 self.psf_action = psf_corrected_action
-
-                self.turbine.step(self.psf_action, self.wind_speed)
+                applied_action = self.psf_action
             except RuntimeError:
                 print("Casadi failed to solve step. Using agent action. Episode done")
                 self.psf_error = True
-                self.turbine.step(action, self.wind_speed)
                 self.psf_action = [0] * len(action)
 
         else:
-            self.turbine.step(action, self.wind_speed)
             self.psf_action = [0] * len(action)
 
         self.agent_action = action
 
-        self.observation = self.observe()
+        reward = 0
+        for i in range(self.decision_interval):
+            if i > 0:
+                self.t_step += 1
+                self.update_wind()
+            self.turbine.step(applied_action, self.wind_speed)
 
-        done, reward = self.calculate_reward(action)
-        done = done or self.psf_error
+            self.observation = self.observe()
+
+            done, step_reward = self.calculate_reward(action)
+            done = done or self.psf_error
+            reward += step_reward
+            self.prev_wind_speed = self.wind_speed
+            if done:
+                break
 
         self.cumulative_reward += reward
         self.last_reward = reward
 
         self.save_latest_step()
-        self.prev_wind_speed = self.wind_speed
 
         self.t_step += 1
 
-        return self.observation, reward, done, {}
+        info = {}
+        if done:
+            # Published through info, so training callbacks need no get_attr round trip to the workers
+            self.save_latest_episode()
+            self.episode_saved = True
+            if self.history:
+                info['episode_history'] = self.history
+
+        return self.observation, reward, done, info
+
+    def update_wind(self):
+        """
+        Sets wind_speed for the time-step t_step. Constant by default.
+        """
 
     @abstractmethod
     def generate_environment(self):
@@ -207,25 +276,23 @@ class BaseTurbineEnv(gym.Env, ABC):
         theta_dot_deg_s = self.turbine.state[1] * RAD2DEG
         omega_rpm = self.turbine.state[2] * RAD2RPM
         omega_dot_rpm_per_sec = self.turbine.omega_dot * RAD2RPM
-        power_error_MegaWatts = np.abs(action[2] - self.turbine.power_regime(self.wind_speed)) * (self.turbine.max_power_generation / 1e6)
+        power_error_MegaWatts = abs(action[2] - self.turbine.power_regime(self.wind_speed)) * (self.turbine.max_power_generation / 1e6)
 
         omega_ref_rpm = self.turbine.omega_setpoint(self.wind_speed) * RAD2RPM
-        omega_error_rpm = np.abs(omega_rpm - omega_ref_rpm)
-
-        # Set each part of the reward
-        self.theta_reward = np.exp(-self.gamma_theta * (np.abs(theta_deg))) - self.gamma_theta * np.abs(theta_deg)
-        self.theta_dot_reward = -self.gamma_theta_dot * theta_dot_deg_s ** 2
-        self.omega_dot_reward = -self.gamma_omega_dot * omega_dot_rpm_per_sec ** 2
-        self.omega_reward = np.exp(-self.gamma_omega * omega_error_rpm) - self.gamma_omega * omega_error_rpm
-        self.power_reward = np.exp(-self.gamma_power * power_error_MegaWatts) - self.gamma_power * power_error_MegaWatts
+        omega_error_rpm = abs(omega_rpm - omega_ref_rpm)
+
         if self.use_psf:
-            self.psf_reward = -self.gamma_psf * np.sum(np.abs(np.subtract(self.agent_action, self.psf_action)))
+            psf_deviation = np.sum(np.abs(np.subtract(self.agent_action, self.psf_action)))
         else:
-            self.psf_reward = 0
+            psf_deviation = 0
+        self.reward_components = self.reward_function.components(theta_deg, theta_dot_deg_s, omega_error_rpm,
+                                                                 omega_dot_rpm_per_sec, power_error_MegaWatts,
+                                                                 psf_deviation)
 
         # Check if episode is done
         end_cond_2 = self.t_step >= self.max_episode_time / self.step_size
-        crash_cond_1 = np.abs(self.turbine.platform_angle) > self.crash_angle_condition
+        # Negated, so a diverged NaN state is a crash
+        crash_cond_1 = not np.abs(self.turbine.platform_angle) <= self.crash_angle_condition
         crash_cond_2 = self.turbine.omega > self.crash_omega_max
         crash_cond_3 = self.turbine.omega < self.crash_omega_min
 
@@ -240,87 +307,13 @@ class BaseTurbineEnv(gym.Env, ABC):
             self.crash_cause = 2  # Crash because of Omega
 
         if self.crashed and self.use_psf:
-            try:
-                report_dir = os.path.join('logs', 'debug')
-                os.makedirs(report_dir, exist_ok=True)
-                file_path = os.path.join(report_dir, "crash_data.csv")
-                data = np.hstack(
-                    [self.crash_cause, self.psf_error, self.turbine.state, self.agent_action, self.psf_action,
-                     self.wind_speed, self.turbine.adjusted_wind_speed])
-                data = data.reshape((1, len(data)))
-                labels = [r"crash_cause", r"psf_error", r"theta", r"theta_dot", r"omega", r"agent_F_thr",
-                          r"agent_blade_pitch", r"agent_power", r"psf_F_thr", r"psf_blade_pitch", r"psf_power",
-                          r"wind_speed", r"adjusted_wind_speed"]
-                df = DataFrame(data, columns=labels)
-                if not os.path.isfile(file_path):
-                    df.to_csv(file_path)
-                else:
-                    df.to_csv(file_path, mode='a', header=False)
-            except PermissionError as e:
-                print('Warning: Report files are open - could not update report: ' + str(repr(e)))
-            except OSError as e:
-                print('Warning: Ignoring OSError: ' + str(repr(e)))
-
-        # reward function (without omega_dot an crash reward), V-0
-        # step_reward = (self.theta_reward
-        #                + self.theta_dot_reward
-        #                + self.omega_reward
-        #                + self.power_reward
-        #                + self.psf_reward
-        #                + self.reward_survival)
-
-        # reward function with crash reward (without omega_dot), V-1
-        # if crash_cond_1 or crash_cond_2 or crash_cond_3:
-        #     step_reward = self.crash_reward
-        # else:
-        #     step_reward = (self.theta_reward
-        #                + self.theta_dot_reward
-        #                + self.omega_reward
-        #                + self.power_reward
-        #                + self.psf_reward
-        #                + self.reward_survival)
-
-        # reward function without omega_dot, crash reward and theta, V-2
-        # step_reward = (self.theta_dot_reward
-        #                + self.omega_reward
-        #                + self.power_reward
-        #                + self.psf_reward
-        #                + self.reward_survival)
-
-        # Power only, V-3
-        # step_reward = self.power_reward
-
-        # Power and crash reward only, V-4
-        # if crash_cond_1 or crash_cond_2 or crash_cond_3:
-        #     step_reward = self.crash_reward
-        # else:
-        #     step_reward = self.power_reward
-
-        # Without theta and crash reward, V-5
-        # step_reward = (self.theta_dot_reward
-        #                + self.omega_reward
-        #                + self.omega_dot_reward
-        #                + self.power_reward
-        #                + self.psf_reward
-        #                + self.reward_survival)
-
-        # Without crash reward, V-6
-        # step_reward = (self.theta_reward
-        #                + self.theta_dot_reward
-        #                + self.omega_reward
-        #                + self.omega_dot_reward
-        #                + self.power_reward
-        #                + self.psf_reward
-        #                + self.reward_survival)
-
-        # Without crash reward and survival, V-7
-        step_reward = (self.theta_reward
-                       + self.theta_dot_reward
-                       + self.omega_reward
-                       + self.omega_dot_reward
-                       + self.power_reward
-                       + self.psf_reward)
+            if self.crash_logger is None:
+                self.crash_logger = CrashLogger()
+            self.crash_logger.log(
+                np.hstack([self.crash_cause, self.psf_error, self.turbine.state, self.agent_action, self.psf_action,
+                           self.wind_speed, self.turbine.adjusted_wind_speed]))
 
+        step_reward = self.reward_function(self.reward_components, self.crashed)
 
         return done, step_reward
 
@@ -334,51 +327,85 @@ class BaseTurbineEnv(gym.Env, ABC):
         obs = np.hstack([self.turbine.state, self.turbine.omega_dot, self.wind_speed])
         return obs
 
+    def close(self):
+        if self.crash_logger is not None:
+            self.crash_logger.close()
+        self.total_history.flush()
+
+    def spill_history(self):
+        """
+        Spills every episode of total_history to history_spill_dir, read them with iter_spilled_histories.
+        """
+        self.total_history.spill()
+
     def seed(self, seed=None):
         """Reseeds the random number generator used in the environment"""
         self.rand_num_gen, seed = seeding.np_random(seed)
         return [seed]
 
+    def get_state(self):
+        """
+        Picklable snapshot of the env during an episode: the turbine, the wind, the random number generator,
+        the PSF warm start and the counters. set_state restores it without re-solving the initial steady state,
+        so rollouts can be branched from the same point.
+        The episode history and total_history are not part of the snapshot.
+        """
+        return {
+            'attributes': {key: copy.copy(getattr(self, key)) for key in self.snapshot_attributes
+                           if hasattr(self, key)},
+            'turbine': self.turbine.snapshot(),
+            'rand_num_gen': copy.deepcopy(self.rand_num_gen),
+            'psf_init_guess': None if self._psf is None else self._psf.get_init_guess(),
+            'recorder': self.recorder.snapshot(),
+        }
+
+    def set_state(self, state):
+        """
+        Restores a snapshot of get_state of this env or an env of the same scenario and config.
+        """
+        for key, value in state['attributes'].items():
+            setattr(self, key, copy.copy(value))
+        self.turbine.restore(state['turbine'])
+        self.rand_num_gen = copy.deepcopy(state['rand_num_gen'])
+        if state['psf_init_guess'] is not None:
+            self.psf.set_init_guess(state['psf_init_guess'])
+        elif self._psf is not None:
+            self._psf.reset_init_guess()
+        self.recorder.restore(state['recorder'])
+
+    @property
+    def episode_history(self):
+        """
+        The steps of the current episode as arrays, only filled with recording_level "full".
+        """
+        return self.recorder.episode_history
+
     def save_latest_step(self):
-        self.episode_history.setdefault('states', []).append(np.copy(self.turbine.state))
-        self.episode_history.setdefault('input', []).append(self.turbine.input)
-        self.episode_history.setdefault('observations', []).append(self.observation)
-        self.episode_history.setdefault('time', []).append(self.t_step * self.step_size)
-        self.episode_history.setdefault('last_reward', []).append(self.last_reward)
-        self.episode_history.setdefault('wind_force', []).append(self.turbine.wind_force)
-        self.episode_history.setdefault('wind_torque', []).append(self.turbine.wind_torque)
-        self.episode_history.setdefault('generator_torque', []).append(self.turbine.generator_torque)
-        self.episode_history.setdefault('adjusted_wind_speed', []).append(self.turbine.adjusted_wind_speed)
-        self.episode_history.setdefault('wind_speed', []).append(self.wind_speed)
-
-        self.episode_history.setdefault('theta_reward', []).append(self.theta_reward)
-        self.episode_history.setdefault('theta_dot_reward', []).append(self.theta_dot_reward)
-        self.episode_history.setdefault('omega_reward', []).append(self.omega_reward)
-        self.episode_history.setdefault('omega_dot_reward', []).append(self.omega_dot_reward)
-        self.episode_history.setdefault('power_reward', []).append(self.power_reward)
-        self.episode_history.setdefault('psf_reward', []).append(self.psf_reward)
-
-        self.episode_history.setdefault('agent_actions', []).append(self.agent_action)
-        self.episode_history.setdefault('psf_actions', []).append(self.psf_action)
+        self.recorder.record(self)
 
     def save_latest_episode(self):
+        if self.recorder.level == "none":
+            return
+        summary = self.recorder.summary()
         self.history = {
             'episode_num': self.episode,
-            'avg_abs_theta': np.abs(np.array(self.episode_history['states'])[:, 0]).mean(),
-            'std_theta': np.array(self.episode_history['states'])[:, 0].std(),
-            'avg_abs_theta_dot': np.abs(np.array(self.episode_history['states'])[:, 1]).mean(),
+            'avg_abs_theta': summary['avg_abs_theta'],
+            'std_theta': summary['std_theta'],
+            'avg_abs_theta_dot': summary['avg_abs_theta_dot'],
             'crashed': int(self.crashed),
             'reward': self.cumulative_reward,
             'timesteps': self.t_step,
             'duration': self.t_step * self.step_size,
-            'wind_speed': np.array(self.episode_history['wind_speed']).mean(),
-            'theta_reward': np.array(self.episode_history['theta_reward']).mean(),
-            'theta_dot_reward': np.array(self.episode_history['theta_dot_reward']).mean(),
-            'omega_reward': np.array(self.episode_history['omega_reward']).mean(),
-            'omega_dot_reward': np.array(self.episode_history['omega_dot_reward']).mean(),
-            'power_reward': np.array(self.episode_history['power_reward']).mean(),
-            'psf_reward': np.array(self.episode_history['psf_reward']).mean(),
+            'wind_speed': summary['wind_speed'],
+            'theta_reward': summary['theta_reward'],
+            'theta_dot_reward': summary['theta_dot_reward'],
+            'omega_reward': summary['omega_reward'],
+            'omega_dot_reward': summary['omega_dot_reward'],
+            'power_reward': summary['power_reward'],
+            'psf_reward': summary['psf_reward'],
             'psf_error': int(self.psf_error),
+            'avg_substeps': summary['avg_substeps'],
+            'max_integration_error': summary['max_integration_error'],
             'crash_cause': self.crash_cause,
         }
 
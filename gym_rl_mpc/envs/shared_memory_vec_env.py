@@ -0,0 +1,242 @@
+import multiprocessing
+
+import numpy as np
+from stable_baselines3.common.vec_env import CloudpickleWrapper, VecEnv
+
+# Commands of the workers, written to the shared command array before a worker is started
+_STEP, _RESET, _REMOTE, _CLOSE = range(4)
+
+
+def _shared_array(ctx, shape, dtype):
+    """
+    Process-shared buffer for an array of shape and dtype, see _as_array.
+    """
+    return ctx.RawArray('b', max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)), shape, np.dtype(dtype)
+
+
+def _as_array(buffer):
+    raw, shape, dtype = buffer
+    return np.frombuffer(raw, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _worker(index, remote, parent_remote, env_fn_wrapper, buffers, start, finished):
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    command, observations, actions, rewards, dones, has_info, ready = (_as_array(b) for b in buffers)
+    try:
+        while True:
+            start.acquire()
+            cmd = command[index]
+            if cmd == _STEP:
+                observation, reward, done, info = env.step(actions[index])
+                if done:
+                    # save final observation where user can get it, then reset
+                    info["terminal_observation"] = observation
+                    observation = env.reset()
+                observations[index] = observation
+                rewards[index] = reward
+                dones[index] = done
+                has_info[index] = bool(info)
+                ready[index] = True
+                finished.release()
+                # Sent after the release, so the main process never waits on a full pipe
+                if info:
+                    remote.send(info)
+            elif cmd == _RESET:
+                observations[index] = env.reset()
+                has_info[index] = False
+                ready[index] = True
+                finished.release()
+            elif cmd == _REMOTE:
+                method, data = remote.recv()
+                if method == "seed":
+                    remote.send(env.seed(data))
+                elif method == "render":
+                    remote.send(env.render(data))
+                elif method == "env_method":
+                    remote.send(getattr(env, data[0])(*data[1], **data[2]))
+                elif method == "get_attr":
+                    remote.send(getattr(env, data))
+                elif method == "set_attr":
+                    remote.send(setattr(env, data[0], data[1]))
+                elif method == "is_wrapped":
+                    remote.send(is_wrapped(env, data))
+                else:
+                    raise NotImplementedError(f"`{method}` is not implemented in the worker")
+            elif cmd == _CLOSE:
+                env.close()
+                remote.close()
+                break
+    except KeyboardInterrupt:
+        print("SharedMemoryVecEnv worker: got KeyboardInterrupt")
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    Drop-in replacement of SubprocVecEnv for envs with per-process state, like the PSF solver, where every env
+    runs in its own process but the actions, observations, rewards and dones are exchanged through arrays in
+    shared memory instead of being pickled through pipes.
+    A step writes the actions, releases one semaphore per worker and waits for the workers on a shared one.
+    Info dicts are only pickled when they are not empty, which for the turbine envs is at the end of an episode.
+    Besides step, the envs can be stepped asynchronously with send and recv, where recv returns the first envs
+    that are done with their step, so slow PSF solves of some envs do not hold back the others.
+    The first env is created once in the main process to read the observation and action spaces.
+    :param env_fns: Functions creating the envs, as for SubprocVecEnv
+    :param start_method: multiprocessing start method, forkserver if available else spawn by default
+    """
+
+    def __init__(self, env_fns, start_method=None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        env = env_fns[0]()
+        observation_space, action_space = env.observation_space, env.action_space
+        env.close()
+
+        if start_method is None:
+            # Same default as SubprocVecEnv, fork is not thread safe
+            forkserver_available = "forkserver" in multiprocessing.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = multiprocessing.get_context(start_method)
+        # The actions reach the envs as sent, as through the pipes of SubprocVecEnv, so float actions are not
+        # rounded to a float32 action space
+        action_dtype = np.float64 if np.issubdtype(action_space.dtype, np.floating) else action_space.dtype
+
+        self._buffers = [
+            _shared_array(ctx, (n_envs,), np.int32),
+            _shared_array(ctx, (n_envs,) + observation_space.shape, observation_space.dtype),
+            _shared_array(ctx, (n_envs,) + action_space.shape, action_dtype),
+            _shared_array(ctx, (n_envs,), np.float64),
+            _shared_array(ctx, (n_envs,), np.bool_),
+            _shared_array(ctx, (n_envs,), np.bool_),
+            _shared_array(ctx, (n_envs,), np.bool_),
+        ]
+        (self._command, self._observations, self._actions, self._rewards, self._dones, self._has_info,
+         self._ready) = (_as_array(b) for b in self._buffers)
+        # Envs sent an action or reset and not received yet
+        self._in_flight = np.zeros(n_envs, dtype=bool)
+
+        self._starts = [ctx.Semaphore(0) for _ in range(n_envs)]
+        self._finished = ctx.Semaphore(0)
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            args = (index, work_remote, remote, CloudpickleWrapper(env_fn), self._buffers, self._starts[index],
+                    self._finished)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def _start(self, command, indices):
+        for i in indices:
+            self._command[i] = command
+            self._starts[i].release()
+
+    def _wait(self, n):
+        """
+        Waits for n envs to finish their step or reset and returns the indices of n of the finished envs.
+        """
+        for _ in range(n):
+            while not self._finished.acquire(timeout=1):
+                # A worker that raised never releases the semaphore
+                if not all(process.is_alive() for process in self.processes):
+                    raise EOFError("A SharedMemoryVecEnv worker has exited")
+        # Each worker sets its flag before releasing, so at least n flags are set
+        env_ids = np.flatnonzero(self._ready & self._in_flight)[:n]
+        self._ready[env_ids] = False
+        self._in_flight[env_ids] = False
+        return env_ids
+
+    def send(self, actions, env_ids=None):
+        """
+        Starts a step of the envs env_ids (all by default) with actions of shape (len(env_ids), ...) and
+        returns without waiting. The envs must have been received since their last send or reset.
+        """
+        env_ids = np.arange(self.num_envs) if env_ids is None else np.asarray(env_ids)
+        if self._in_flight[env_ids].any():
+            raise ValueError("An env can not be sent an action before the previous step is received")
+        self._actions[env_ids] = np.reshape(actions, (len(env_ids),) + self._actions.shape[1:])
+        self._in_flight[env_ids] = True
+        self._start(_STEP, env_ids)
+
+    def recv(self, batch_size=None):
+        """
+        Waits for the first batch_size (all in flight by default) envs that are done with their step and returns
+        their observations, rewards, dones, infos and env_ids, ordered by env id.
+        """
+        if batch_size is None:
+            batch_size = int(self._in_flight.sum())
+        if batch_size > self._in_flight.sum():
+            raise ValueError(f"Can not receive {batch_size} envs with {self._in_flight.sum()} in flight")
+        env_ids = self._wait(batch_size)
+        infos = [self.remotes[i].recv() if self._has_info[i] else {} for i in env_ids]
+        return (self._observations[env_ids], self._rewards[env_ids], self._dones[env_ids], infos, env_ids)
+
+    def step_async(self, actions):
+        self.send(actions)
+        self.waiting = True
+
+    def step_wait(self):
+        obs, rewards, dones, infos, _ = self.recv(self.num_envs)
+        self.waiting = False
+        return obs, rewards, dones, infos
+
+    def reset(self):
+        if self._in_flight.any():
+            self.recv()
+        self._in_flight[:] = True
+        self._start(_RESET, range(self.num_envs))
+        self._wait(self.num_envs)
+        return self._observations.copy()
+
+    def _remote(self, method, data, indices):
+        """
+        Calls method in the workers of indices through the pipes, data is one value per index.
+        """
+        if self._in_flight[list(indices)].any():
+            raise ValueError(f"Can not call {method} of envs with a step in flight, recv them first")
+        self._start(_REMOTE, indices)
+        for i, value in zip(indices, data):
+            self.remotes[i].send((method, value))
+        return [self.remotes[i].recv() for i in indices]
+
+    def seed(self, seed=None):
+        indices = range(self.num_envs)
+        return self._remote("seed", [None if seed is None else seed + i for i in indices], indices)
+
+    def close(self):
+        if self.closed:
+            return
+        if self._in_flight.any():
+            self.recv()
+        self._start(_CLOSE, range(self.num_envs))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def get_images(self):
+        indices = range(self.num_envs)
+        return self._remote("render", ["rgb_array"] * self.num_envs, indices)
+
+    def get_attr(self, attr_name, indices=None):
+        indices = list(self._get_indices(indices))
+        return self._remote("get_attr", [attr_name] * len(indices), indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        indices = list(self._get_indices(indices))
+        self._remote("set_attr", [(attr_name, value)] * len(indices), indices)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        indices = list(self._get_indices(indices))
+        return self._remote("env_method", [(method_name, method_args, method_kwargs)] * len(indices), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        indices = list(self._get_indices(indices))
+        return self._remote("is_wrapped", [wrapper_class] * len(indices), indices)
@@ -2,6 +2,7 @@ import numpy as np
 
 from gym_rl_mpc.envs.base_turbine_env import BaseTurbineEnv
 from gym_rl_mpc.objects.turbine import Turbine
+from gym_rl_mpc.objects.wind import load_wind_record, record_windows, wind_series
 
 
 class ConstantWind(BaseTurbineEnv):
@@ -14,7 +15,8 @@ class ConstantWind(BaseTurbineEnv):
         Generates environment with a turbine and a random wind speed between min and max wind speed in config
         """
         self.wind_speed = (self.max_wind_speed - self.min_wind_speed) * self.rand_num_gen.rand() + self.min_wind_speed
-        self.turbine = Turbine(self.wind_speed, self.step_size)
+        self.turbine = Turbine(self.wind_speed, self.step_size, backend=self.turbine_backend,
+                               integration_tol=self.integration_tol)
 
 class ConstantWindLevel1(ConstantWind):
     def __init__(self, *args, **kwargs) -> None:
@@ -33,19 +35,15 @@ class BaseVariableWind(BaseTurbineEnv):
     Subclasses must set variables: max_wind_amplitude, max_wind_speed, min_wind_speed, wind_noise
     If wind_noise is True, wind_noise_std must also be set.
     """
+    snapshot_attributes = BaseTurbineEnv.snapshot_attributes + ['wind_series', 'wind_amplitude', 'wind_mean',
+                                                                 'wind_phase_shift']
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
-    def step(self, action):
-        t = self.t_step * self.step_size
-
-        wind_speed = self.wind_amplitude * np.sin(
-            (1 / self.wind_period) * 2 * np.pi * t + self.wind_phase_shift) + self.wind_mean
-        if self.wind_noise:
-            wind_speed += np.random.normal(0, self.wind_noise_std)
-        self.wind_speed = np.clip(wind_speed, self.min_wind_speed, self.max_wind_speed)
-
-        return super().step(action)
+    def update_wind(self):
+        # The series has one value per step of a full episode, the last one is held if the episode runs longer
+        self.wind_speed = self.wind_series[min(self.t_step, len(self.wind_series) - 1)]
 
     def generate_environment(self):
         """
@@ -56,9 +54,22 @@ class BaseVariableWind(BaseTurbineEnv):
         self.wind_mean = (self.max_wind_speed - self.min_wind_speed - 2 * self.wind_amplitude) * self.rand_num_gen.rand() + self.min_wind_speed + self.wind_amplitude
         self.wind_phase_shift = 2 * np.pi * self.rand_num_gen.rand()
 
-        self.wind_speed = self.wind_amplitude * np.sin(self.wind_phase_shift) + self.wind_mean
+        self.generate_wind_series()
+        self.turbine = Turbine(self.wind_speed, self.step_size, backend=self.turbine_backend,
+                               integration_tol=self.integration_tol)
+
+    def generate_wind_series(self):
+        """
+        Generates the wind speed of every step of the episode from wind_mean, wind_amplitude and wind_phase_shift.
+        """
+        self.wind_series = wind_series(
+            int(np.ceil(self.max_episode_time / self.step_size)) + 1, self.step_size, self.rand_num_gen,
+            self.wind_mean, self.wind_amplitude, self.wind_period, self.wind_phase_shift,
+            noise_std=self.wind_noise_std if self.wind_noise else 0, spectrum=self.turbulence_spectrum,
+            turbulence_intensity=self.turbulence_intensity, gust_amplitude=self.gust_amplitude,
+            min_wind_speed=self.min_wind_speed, max_wind_speed=self.max_wind_speed)
+        self.wind_speed = self.wind_series[0]
         self.prev_wind_speed = self.wind_speed
-        self.turbine = Turbine(self.wind_speed, self.step_size)
 
 
 class VariableWindLevel0(BaseVariableWind):
@@ -176,9 +187,36 @@ class VariableWindPSFtestManual(BaseVariableWind):
         """
         self.wind_phase_shift = 0
 
-        self.wind_speed = self.wind_amplitude * np.sin(self.wind_phase_shift) + self.wind_mean
+        self.generate_wind_series()
+        self.turbine = Turbine(self.wind_speed, self.step_size, backend=self.turbine_backend,
+                               integration_tol=self.integration_tol)
+
+class RecordedWind(BaseVariableWind):
+    """
+    Replays random windows of measured wind speeds from the .npy file wind_file, sampled every
+    wind_file_step_size seconds. The file is memory-mapped read-only, so all workers share it without copies.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+    def draw_wind_series(self, rng, n_windows=None):
+        """
+        Wind speed at every step of n_windows episodes (one if None), clipped to [min_wind_speed, max_wind_speed].
+        """
+        windows = record_windows(load_wind_record(self.wind_file), self.wind_file_step_size,
+                                 int(np.ceil(self.max_episode_time / self.step_size)) + 1, self.step_size, rng,
+                                 n_windows)
+        return np.clip(windows, self.min_wind_speed, self.max_wind_speed)
+
+    def generate_environment(self):
+        """
+        Generates environment with a turbine and a random window of the recorded wind
+        """
+        self.wind_series = self.draw_wind_series(self.rand_num_gen)
+        self.wind_speed = self.wind_series[0]
         self.prev_wind_speed = self.wind_speed
-        self.turbine = Turbine(self.wind_speed, self.step_size)
+        self.turbine = Turbine(self.wind_speed, self.step_size, backend=self.turbine_backend,
+                               integration_tol=self.integration_tol)
 
 class CrazyAgent(VariableWindLevel4):
     def __init__(self, *args, **kwargs) -> None:
@@ -0,0 +1,306 @@
+import inspect
+from time import time
+
+import gym
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+
+import gym_rl_mpc
+from gym_rl_mpc import DEFAULT_CONFIG
+import gym_rl_mpc.utils.model_params as params
+from gym_rl_mpc.envs.turbine_env import BaseVariableWind, CrazyAgent, RecordedWind, VariableWindPSFtestManual
+from gym_rl_mpc.objects.turbine import TurbineBatch
+from gym_rl_mpc.objects.wind import wind_series
+from gym_rl_mpc.utils.history import EpisodeHistory
+from gym_rl_mpc.utils.model_params import RAD2DEG, RAD2RPM
+from gym_rl_mpc.utils.reward import REWARD_COMPONENTS
+
+
+class VecTurbineEnv(VecEnv):
+    """
+    n_envs copies of the scenario env_id without PSF, stepped together on arrays in one process.
+    Implements the stable-baselines3 VecEnv interface with the same observations, rewards, episode ends and
+    history/total_history/episode attributes as a SubprocVecEnv of the scenario, and auto-resets finished envs
+    with the terminal observation in the info dict.
+    The turbines are simulated with TurbineBatch, which evaluates the generated code of the default turbine_backend
+    with one RK45 step per step_size, so other values of turbine_backend and integration_tol are rejected.
+    """
+
+    def __init__(self, env_id, n_envs, env_config=None, seed=None):
+        if env_config is None:
+            env_config = gym_rl_mpc.SCENARIOS[env_id]['config']
+        env_config = env_config.copy()
+        if env_config['use_psf']:
+            raise ValueError("VecTurbineEnv does not support the PSF, use SubprocVecEnv")
+        for key in ['turbine_backend', 'integration_tol']:
+            if env_config.get(key, DEFAULT_CONFIG[key]) != DEFAULT_CONFIG[key]:
+                raise ValueError(f"VecTurbineEnv only supports {key}={DEFAULT_CONFIG[key]!r}, use SubprocVecEnv")
+
+        # The scenario parameters are set in the constructors of the scenario classes
+        self.template = gym.make(env_id, env_config=env_config).unwrapped
+        super().__init__(n_envs, self.template.observation_space, self.template.action_space)
+        self.env_id = env_id
+        self.config = env_config
+        self.step_size = self.template.step_size
+        self.variable_wind = isinstance(self.template, BaseVariableWind)
+
+        self.turbines = None
+        self.actions = None
+        self.rng = None
+        self.seed(seed)
+
+        self.episode = np.zeros(n_envs, dtype=int)
+        self.total_t_steps = np.zeros(n_envs, dtype=int)
+        self.t_step = np.zeros(n_envs, dtype=int)
+        self.n_records = np.zeros(n_envs, dtype=int)  # Decisions of the episode
+        self.decision_interval = env_config['decision_interval']
+        self.cumulative_reward = np.zeros(n_envs)
+        self.crash_cause = np.full(n_envs, -1)
+        self.wind_speed = np.zeros(n_envs)
+        self.wind_amplitude = np.zeros(n_envs)
+        self.wind_mean = np.zeros(n_envs)
+        self.wind_phase_shift = np.zeros(n_envs)
+        # Wind speed at every step of the current episode of each variable wind env
+        self.wind_series = np.zeros((n_envs, int(np.ceil(env_config['max_episode_time'] / self.step_size)) + 1))
+        self.episode_start = np.zeros(n_envs)
+        # Per episode sums of the quantities averaged in history
+        self._sums = {key: np.zeros(n_envs) for key in
+                      ['abs_theta', 'theta', 'theta_sq', 'abs_theta_dot', 'wind_speed'] + REWARD_COMPONENTS}
+
+        self.history = [{} for _ in range(n_envs)]
+        self.total_history = [EpisodeHistory(env_config['history_length'], env_config['history_spill_dir'])
+                              for _ in range(n_envs)]
+
+    def _generate_environment(self, indices):
+        """
+        Draws the wind of the envs at indices like generate_environment of the scenario.
+        """
+        t = self.template
+        n = len(indices)
+        if isinstance(t, RecordedWind):
+            self.wind_series[indices] = t.draw_wind_series(self.rng, n)
+            self.wind_speed[indices] = self.wind_series[indices, 0]
+        elif self.variable_wind:
+            if isinstance(t, VariableWindPSFtestManual):
+                # wind_amplitude and wind_mean are set by hand with set_attr
+                self.wind_phase_shift[indices] = 0
+            else:
+                amplitude = min((t.max_wind_speed - t.min_wind_speed) / 2, t.max_wind_amplitude) * self.rng.random(n)
+                self.wind_amplitude[indices] = amplitude
+                self.wind_mean[indices] = (t.max_wind_speed - t.min_wind_speed - 2 * amplitude) * self.rng.random(n) \
+                                          + t.min_wind_speed + amplitude
+                self.wind_phase_shift[indices] = 2 * np.pi * self.rng.random(n)
+            self.wind_series[indices] = wind_series(
+                self.wind_series.shape[1], self.step_size, self.rng, self.wind_mean[indices],
+                self.wind_amplitude[indices], t.wind_period, self.wind_phase_shift[indices],
+                noise_std=t.wind_noise_std if t.wind_noise else 0, spectrum=t.turbulence_spectrum,
+                turbulence_intensity=t.turbulence_intensity, gust_amplitude=t.gust_amplitude,
+                min_wind_speed=t.min_wind_speed, max_wind_speed=t.max_wind_speed)
+            self.wind_speed[indices] = self.wind_series[indices, 0]
+        else:
+            self.wind_speed[indices] = (t.max_wind_speed - t.min_wind_speed) * self.rng.random(n) + t.min_wind_speed
+
+        if self.turbines is None:
+            self.turbines = TurbineBatch(self.wind_speed, self.step_size)
+        else:
+            self.turbines.reset(indices, self.wind_speed[indices])
+
+    def _update_wind(self):
+        if not self.variable_wind:
+            return
+        # The last value of the series is held if an episode runs longer
+        self.wind_speed = self.wind_series[np.arange(self.num_envs),
+                                           np.minimum(self.t_step, self.wind_series.shape[1] - 1)]
+
+    def _reset_envs(self, indices):
+        self.episode[indices] += 1
+        self.total_t_steps[indices] += self.t_step[indices]
+        self.t_step[indices] = 0
+        self.n_records[indices] = 0
+        self.cumulative_reward[indices] = 0
+        self.crash_cause[indices] = -1
+        self.episode_start[indices] = time()
+        for s in self._sums.values():
+            s[indices] = 0
+        self._generate_environment(indices)
+
+    def _save_latest_episode(self, i, crashed):
+        n = self.n_records[i]
+        mean_theta = self._sums['theta'][i] / n
+        history = {
+            'episode_num': self.episode[i],
+            'avg_abs_theta': self._sums['abs_theta'][i] / n,
+            'std_theta': np.sqrt(max(self._sums['theta_sq'][i] / n - mean_theta ** 2, 0)),
+            'avg_abs_theta_dot': self._sums['abs_theta_dot'][i] / n,
+            'crashed': int(crashed),
+            'reward': self.cumulative_reward[i],
+            'timesteps': self.t_step[i],
+            'duration': self.t_step[i] * self.step_size,
+            'wind_speed': self._sums['wind_speed'][i] / n,
+        }
+        for key in REWARD_COMPONENTS:
+            history[key] = self._sums[key][i] / n
+        history['psf_error'] = 0
+        # TurbineBatch takes one fixed RK45 step per step_size and does not estimate the error
+        history['avg_substeps'] = 1
+        history['max_integration_error'] = np.nan
+        history['crash_cause'] = self.crash_cause[i]
+        self.history[i] = history
+        self.total_history[i].append(history)
+
+    def observe(self):
+        return np.hstack([self.turbines.state, self.turbines.omega_dot[:, None], self.wind_speed[:, None]]).astype(
+            np.float32)
+
+    def calculate_reward(self, actions):
+        """
+        Vectorized BaseTurbineEnv.calculate_reward with the reward version of the config, without PSF.
+        """
+        t = self.template
+        turbines = self.turbines
+        theta_deg = turbines.platform_angle * RAD2DEG
+        theta_dot_deg_s = turbines.state[:, 1] * RAD2DEG
+        omega_rpm = turbines.omega * RAD2RPM
+        omega_dot_rpm_per_sec = turbines.omega_dot * RAD2RPM
+        power_error_MegaWatts = np.abs(actions[:, 2] - params.power_regime(self.wind_speed)) * (
+                params.max_power_generation / 1e6)
+        omega_error_rpm = np.abs(omega_rpm - params.omega_setpoint(self.wind_speed) * RAD2RPM)
+
+        rewards = t.reward_function.components(theta_deg, theta_dot_deg_s, omega_error_rpm, omega_dot_rpm_per_sec,
+                                               power_error_MegaWatts, np.zeros(self.num_envs))
+
+        end_cond_2 = self.t_step >= t.max_episode_time / self.step_size
+        # Negated, so a diverged NaN state is a crash
+        crash_cond_1 = ~(np.abs(turbines.platform_angle) <= t.crash_angle_condition)
+        crash_cond_2_3 = (turbines.omega > t.crash_omega_max) | (turbines.omega < t.crash_omega_min)
+        crashed = crash_cond_1 | crash_cond_2_3
+        done = end_cond_2 | crashed
+        self.crash_cause = np.select([end_cond_2, crash_cond_1, crash_cond_2_3], [0, 1, 2], self.crash_cause)
+
+        # Broadcast in case the reward version has no per env terms
+        step_reward = t.reward_function(rewards, crashed) + np.zeros(self.num_envs)
+        return done, crashed, step_reward, rewards
+
+    def reset(self):
+        self._reset_envs(np.arange(self.num_envs))
+        return self.observe()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self):
+        actions = self.actions
+        if isinstance(self.template, CrazyAgent):
+            space = self.action_space
+            actions = self.template.action_space_increase * self.rng.uniform(space.low, space.high, actions.shape)
+
+        # The actions are held for decision_interval time-steps. Envs that finish during the decision keep the
+        # values of their last time-step, and are reset afterwards.
+        finished = np.zeros(self.num_envs, dtype=bool)
+        reward = np.zeros(self.num_envs)
+        for j in range(self.decision_interval):
+            active = ~finished
+            if j > 0:
+                self.t_step += active
+            crash_cause = self.crash_cause
+            self._update_wind()
+            self.turbines.step(actions, self.wind_speed)
+            step_obs = self.observe()
+            step_done, step_crashed, step_reward, step_rewards = self.calculate_reward(actions)
+            if j == 0:
+                obs, crashed, rewards = step_obs, step_crashed, step_rewards
+                state, wind_speed = self.turbines.state.copy(), self.wind_speed.copy()
+            else:
+                self.crash_cause = np.where(active, self.crash_cause, crash_cause)
+                obs[active] = step_obs[active]
+                crashed[active] = step_crashed[active]
+                state[active] = self.turbines.state[active]
+                wind_speed[active] = self.wind_speed[active]
+                for key in REWARD_COMPONENTS:
+                    rewards[key] = np.where(active, step_rewards[key], rewards[key])
+            reward += np.where(active, step_reward, 0)
+            finished |= step_done
+        done = finished
+
+        self.cumulative_reward += reward
+        # One record per decision, like BaseTurbineEnv.save_latest_step
+        self.n_records += 1
+        self._sums['abs_theta'] += np.abs(state[:, 0])
+        self._sums['theta'] += state[:, 0]
+        self._sums['theta_sq'] += state[:, 0] ** 2
+        self._sums['abs_theta_dot'] += np.abs(state[:, 1])
+        self._sums['wind_speed'] += wind_speed
+        for key in REWARD_COMPONENTS:
+            self._sums[key] += rewards[key]
+        self.t_step += 1
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_indices = np.flatnonzero(done)
+        for i in done_indices:
+            infos[i]['terminal_observation'] = obs[i].copy()
+            # Same as the Monitor wrapper of make_vec_env
+            infos[i]['episode'] = {'r': self.cumulative_reward[i], 'l': self.n_records[i],
+                                   't': round(time() - self.episode_start[i], 6)}
+            self._save_latest_episode(i, crashed[i])
+            infos[i]['episode_history'] = self.history[i]
+        if done_indices.size:
+            self._reset_envs(done_indices)
+            obs[done_indices] = self.observe()[done_indices]
+        return obs, reward, done, infos
+
+    def close(self):
+        self.template.close()
+        for history in self.total_history:
+            history.flush()
+
+    def spill_history(self, indices=None):
+        """
+        Spills every episode of total_history of the envs to history_spill_dir.
+        """
+        for i in self._get_indices(indices):
+            self.total_history[i].spill()
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def _get_indices(self, indices):
+        # VecEnv only takes a Python int for a single env, not the numpy integers of np.flatnonzero
+        if isinstance(indices, np.integer):
+            indices = int(indices)
+        return super()._get_indices(indices)
+
+    def _per_env(self, value, indices):
+        """
+        The values of the envs indices of an attribute or method result: an array or list of one value per env
+        is split, anything else is the same for all envs.
+        """
+        if isinstance(value, (np.ndarray, list)) and len(value) == self.num_envs:
+            return [value[i] for i in indices]
+        return [value] * len(indices)
+
+    def get_attr(self, attr_name, indices=None):
+        return self._per_env(getattr(self, attr_name), list(self._get_indices(indices)))
+
+    def set_attr(self, attr_name, value, indices=None):
+        current = getattr(self, attr_name, None)
+        if isinstance(current, np.ndarray) and current.shape[:1] == (self.num_envs,):
+            current[list(self._get_indices(indices))] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        Calls method_name of this env, which holds the state of all envs. Methods with an indices parameter, like
+        spill_history, are called once for the envs indices and return None or one value per index. Other methods,
+        like observe, are called once and their result is split per env as in get_attr.
+        """
+        indices = list(self._get_indices(indices))
+        method = getattr(self, method_name)
+        if 'indices' in inspect.signature(method).parameters:
+            result = method(*method_args, indices=indices, **method_kwargs)
+            return [None] * len(indices) if result is None else list(result)
+        return self._per_env(method(*method_args, **method_kwargs), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(list(self._get_indices(indices)))
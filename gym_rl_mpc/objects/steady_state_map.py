@@ -0,0 +1,169 @@
+import logging
+import os
+import tempfile
+from hashlib import sha1
+from pathlib import Path
+
+import numpy as np
+from casadi import vertcat
+
+import gym_rl_mpc.objects.symbolic_model as sym
+from PSF.utils import Hh_from_disconnected_constraints, formulate_center_problem, formulate_steady_state_problem, \
+    polytope_center, solve
+
+LEN_FILE_STR = 20
+MAP_PATH = Path(__file__).parent / "stored_steady_state"
+INITIAL_WINDS = np.linspace(2, 20, 361)  # Adjusted wind speeds of the initial condition table
+
+_initial_condition_tables = {}
+
+
+def _map_problem(mode):
+    """
+    Decision variables, fixed parameters and the index of the fixed input in u for each map type.
+    """
+    if mode == "power":
+        v = vertcat(sym.x, sym.F_thr, sym.u_p)
+        p = vertcat(sym.w, sym.P_ref)
+        lub = np.vstack([sym.sys_lub_x, sym.sys_lub_u[[0, 1]]])
+        fixed = 2
+    elif mode == "blade_pitch":
+        v = vertcat(sym.x, sym.F_thr, sym.P_ref)
+        p = vertcat(sym.w, sym.u_p)
+        lub = np.vstack([sym.sys_lub_x, sym.sys_lub_u[[0, 2]]])
+        fixed = 1
+    else:
+        raise ValueError(f"{mode} is not a implemented map")
+    return v, p, lub, fixed
+
+
+def solve_steady_state_map(winds, setpoints, mode="power"):
+    """
+    Solves the steady state problem on the grid winds x setpoints with one parametric solver.
+    Every grid point is warm started from the solution of its neighbour in the sweep.
+    Parameters:
+        winds: 1d array of adjusted wind speeds.
+        setpoints: 1d array of generator power (mode="power") or blade pitch (mode="blade_pitch").
+    Returns:
+        z: (len(winds), len(setpoints), nx + nu + 1) array of [x, u, w], NaN where no steady state was found.
+    """
+    winds = np.asarray(winds, dtype=float)
+    setpoints = np.asarray(setpoints, dtype=float)
+    v, p, lub, fixed = _map_problem(mode)
+    Hv, hv = Hh_from_disconnected_constraints(lub)
+    solver, lbg, ubg = formulate_steady_state_problem(sym.symbolic_x_dot, v, Hv, hv, p)
+    center = polytope_center(Hv, hv)
+
+    nx = sym.x.shape[0]
+    nv = v.shape[0]
+    sol = np.full((winds.shape[0], setpoints.shape[0], nv), np.nan)
+    for i, wind in enumerate(winds):
+        for j, setpoint in enumerate(setpoints):
+            neighbours = [sol[i, j - 1] if j > 0 else None, sol[i - 1, j] if i > 0 else None]
+            v0 = next((n for n in neighbours if n is not None and not np.isnan(n).any()), center.flatten())
+            try:
+                s = solver(x0=v0, p=vertcat(wind, setpoint), lbg=vertcat(*lbg), ubg=vertcat(*ubg))
+            except RuntimeError:
+                continue
+            sol[i, j] = np.asarray(s['x']).flatten()
+
+    z = np.full((winds.shape[0], setpoints.shape[0], nx + sym.u.shape[0] + 1), np.nan)
+    free = [i for i in range(sym.u.shape[0]) if i != fixed]
+    z[..., :nx] = sol[..., :nx]
+    z[..., [nx + i for i in free]] = sol[..., nx:]
+    z[..., nx + fixed] = np.where(np.isnan(sol[..., 0]), np.nan, setpoints[None, :])
+    z[..., -1] = np.where(np.isnan(sol[..., 0]), np.nan, winds[:, None])
+    return z
+
+
+def _load_or_solve(s, solve_map, path):
+    filename = sha1(s.encode()).hexdigest()[:LEN_FILE_STR]
+    file_path = Path(path, filename + ".npy")
+    try:
+        logging.info(f"Trying to load pre-stored map at: {file_path}")
+        return np.load(file_path)
+    except FileNotFoundError:
+        logging.info("Could not find stored map, solving a new one.")
+    except (ValueError, EOFError, OSError):
+        logging.warning(f"Could not read stored map at: {file_path}, solving a new one.")
+    z = solve_map()
+    Path(path).mkdir(parents=True, exist_ok=True)
+    # Written next to the map and moved into place, so processes loading it never read a partly written file
+    with tempfile.NamedTemporaryFile(dir=path, prefix=filename, suffix=".npy", delete=False) as f:
+        np.save(f, z)
+    os.replace(f.name, file_path)
+    return z
+
+
+def steady_state_map(winds, setpoints, mode="power", path=MAP_PATH):
+    """
+    Loads the steady state map for the grid from path, solving and storing it if it is not there.
+    See solve_steady_state_map.
+    """
+    winds = np.asarray(winds, dtype=float)
+    setpoints = np.asarray(setpoints, dtype=float)
+    s = str((mode, winds.tolist(), setpoints.tolist(), sym.sys_lub_x.tolist(), sym.sys_lub_u.tolist()))
+    return _load_or_solve(s, lambda: solve_steady_state_map(winds, setpoints, mode), path)
+
+
+def solve_initial_condition_table(winds, lub=None):
+    """
+    Solves the initial problem of sym.solve_initial_problem for every wind with one parametric solver.
+    Parameters:
+        winds: 1d array of adjusted wind speeds.
+        lub: Lower and upper bounds of [x, u], the model constraints of sym by default.
+    Returns:
+        z: (len(winds), nx + nu) array of [x0, u0], NaN where the problem could not be solved.
+    """
+    winds = np.asarray(winds, dtype=float)
+    if lub is None:
+        lub = np.vstack([sym.sys_lub_x, sym.sys_lub_u])
+    v = vertcat(sym.x, sym.u)
+    Hv, hv = Hh_from_disconnected_constraints(lub)
+    solver, lbg, ubg = formulate_center_problem(sym.symbolic_x_dot, v, Hv, hv, sym.w)
+    center = polytope_center(Hv, hv)
+
+    z = np.full((winds.shape[0], v.shape[0]), np.nan)
+    for i, wind in enumerate(winds):
+        # Same initial guess as sym.solve_initial_problem, so the table holds the same solutions
+        try:
+            z[i] = solve(solver, lbg, ubg, center, wind).flatten()
+        except RuntimeError:
+            continue
+    return z
+
+
+def initial_condition_table(winds=INITIAL_WINDS, path=MAP_PATH):
+    """
+    Loads the initial condition table for the model constraints of sym, solving and storing it if it is not there.
+    Loaded tables are kept in memory.
+    See solve_initial_condition_table.
+    """
+    winds = np.asarray(winds, dtype=float)
+    lub = np.vstack([sym.sys_lub_x, sym.sys_lub_u])
+    key = (winds.tobytes(), lub.tobytes(), str(path))
+    if key not in _initial_condition_tables:
+        s = str(("initial", winds.tolist(), sym.sys_lub_x.tolist(), sym.sys_lub_u.tolist()))
+        _initial_condition_tables[key] = _load_or_solve(s, lambda: solve_initial_condition_table(winds, lub), path)
+    return _initial_condition_tables[key]
+
+
+def initial_condition(wind, residual_tol=1e-5):
+    """
+    Drop-in for sym.solve_initial_problem. Interpolates (x0, u0) linearly in initial_condition_table, and solves
+    the NLP only outside the table, next to unsolved table entries, or when max |x_dot(x0, u0, wind)| of the
+    interpolated point is above residual_tol.
+    """
+    table = initial_condition_table()
+    nx = sym.x.shape[0]
+    if INITIAL_WINDS[0] <= wind <= INITIAL_WINDS[-1]:
+        i = min(max(np.searchsorted(INITIAL_WINDS, wind), 1), INITIAL_WINDS.shape[0] - 1)
+        t = (wind - INITIAL_WINDS[i - 1]) / (INITIAL_WINDS[i] - INITIAL_WINDS[i - 1])
+        z0 = (1 - t) * table[i - 1] + t * table[i]
+        if not np.isnan(z0).any():
+            x_dot, _, _ = sym.get_python_dynamics("math")(z0[:nx].tolist(), z0[nx:].tolist(), float(wind))
+            if max(abs(e) for e in x_dot) <= residual_tol:
+                x0, u0 = np.split(z0.reshape(-1, 1), [nx])
+                return x0, u0
+    logging.debug(f"No initial condition in the table for wind {wind}, solving the initial problem.")
+    return sym.solve_initial_problem(wind)
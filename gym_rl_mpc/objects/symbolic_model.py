@@ -1,10 +1,12 @@
-import multiprocessing
+from functools import lru_cache
 
 import numpy as np
 from casadi import SX, vertcat, cos, sin, Function
 
 import gym_rl_mpc.utils.model_params as params
+from PSF.linearization import Linearization
 from PSF.utils import center_optimization, Hh_from_disconnected_constraints, steady_state, sample_inside_polytope
+from gym_rl_mpc.utils.codegen import function_to_python
 from gym_rl_mpc.utils.model_params import RPM2RAD, DEG2RAD
 
 # Constants
@@ -55,25 +57,128 @@ sys_lub_p = np.asarray([
     [10, 25],
 ])
 
-_numerical_x_dot = Function("numerical_x_dot",
-                            [x, u_p, F_thr, P_ref, w],
-                            [symbolic_x_dot],
-                            ["x", "u_p", "F_thr", "P_ref", "w"],
-                            ["x_dot"])
-_numerical_F_wind = Function("numerical_F_wind", [Omega, u_p, w], [F_wind], ["Omega", "u_p", "w"], ["F_wind"])
-_numerical_Q_wind = Function("numerical_Q_wind", [Omega, u_p, w], [Q_wind], ["Omega", "u_p", "w"], ["Q_wind"])
+# The numerical Functions and the Python code generated from them are built on first use, see __getattr__
+
+
+@lru_cache(maxsize=None)
+def get_numerical_x_dot():
+    return Function("numerical_x_dot",
+                    [x, u_p, F_thr, P_ref, w],
+                    [symbolic_x_dot],
+                    ["x", "u_p", "F_thr", "P_ref", "w"],
+                    ["x_dot"])
+
+
+@lru_cache(maxsize=None)
+def get_numerical_F_wind():
+    return Function("numerical_F_wind", [Omega, u_p, w], [F_wind], ["Omega", "u_p", "w"], ["F_wind"])
+
+
+@lru_cache(maxsize=None)
+def get_numerical_Q_wind():
+    return Function("numerical_Q_wind", [Omega, u_p, w], [Q_wind], ["Omega", "u_p", "w"], ["Q_wind"])
+
+
+@lru_cache(maxsize=None)
+def get_numerical_dynamics():
+    return Function("numerical_dynamics",
+                    [x, u, w],
+                    [symbolic_x_dot, F_wind, Q_wind],
+                    ["x", "u", "w"],
+                    ["x_dot", "F_wind", "Q_wind"])
+
+
+@lru_cache(maxsize=None)
+def get_python_dynamics(module="math"):
+    return function_to_python(get_numerical_dynamics(), module)
+
+
+@lru_cache(maxsize=None)
+def get_linearization():
+    """
+    Linearization of symbolic_x_dot in (x, u) around operating points (x, u, w).
+    """
+    return Linearization(symbolic_x_dot, x, u, w)
+
+
+_LAZY_ATTRIBUTES = {
+    "_numerical_x_dot": get_numerical_x_dot,
+    "_numerical_F_wind": get_numerical_F_wind,
+    "_numerical_Q_wind": get_numerical_Q_wind,
+    "_numerical_dynamics": get_numerical_dynamics,
+    "math_dynamics": lambda: get_python_dynamics("math"),
+    "numpy_dynamics": lambda: get_python_dynamics("numpy"),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def numerical_F_wind(rotation_speed, wind, blade_pitch):
-    return np.asarray(_numerical_Q_wind(rotation_speed, blade_pitch, wind)).flatten()[0]
+    return np.asarray(get_numerical_F_wind()(rotation_speed, blade_pitch, wind)).flatten()[0]
 
 
 def numerical_Q_wind(rotation_speed, wind, blade_pitch):
-    return np.asarray(_numerical_F_wind(rotation_speed, blade_pitch, wind)).flatten()[0]
+    return np.asarray(get_numerical_Q_wind()(rotation_speed, blade_pitch, wind)).flatten()[0]
 
 
 def numerical_x_dot(state, blade_pitch, propeller_thrust, power, wind):
-    return np.asarray(_numerical_x_dot(state, blade_pitch, propeller_thrust, power, wind)).flatten()
+    return np.asarray(get_numerical_x_dot()(state, blade_pitch, propeller_thrust, power, wind)).flatten()
+
+
+class NumericalDynamics:
+    """
+    Evaluates x_dot, F_wind and Q_wind with one call of _numerical_dynamics. Arguments are copied into, and results
+    read from, preallocated arrays bound to the Function buffer, avoiding the DM conversion of a regular call.
+    """
+
+    def __init__(self):
+        self.state = np.zeros(x.shape[0])
+        self.input = np.zeros(u.shape[0])
+        self.wind = np.zeros(1)
+        self.x_dot = np.zeros(x.shape[0])
+        self.F_wind = np.zeros(1)
+        self.Q_wind = np.zeros(1)
+
+        self._buffer, self._eval = get_numerical_dynamics().buffer()
+        for i, arg in enumerate([self.state, self.input, self.wind]):
+            self._buffer.set_arg(i, memoryview(arg))
+        for i, res in enumerate([self.x_dot, self.F_wind, self.Q_wind]):
+            self._buffer.set_res(i, memoryview(res))
+
+    def __call__(self, state, input, wind):
+        """
+        Returns:
+            x_dot: np.array. Copy of the state derivative.
+            F_wind: float.
+            Q_wind: float.
+        """
+        self.state[:] = state
+        self.input[:] = input
+        self.wind[0] = wind
+        self._eval()
+        return self.x_dot.copy(), self.F_wind[0], self.Q_wind[0]
+
+    def __getstate__(self):
+        # The Function buffer can not be pickled, it is rebuilt on load
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+class PythonDynamics:
+    """
+    Evaluates x_dot, F_wind and Q_wind with Python code generated from _numerical_dynamics, same interface as
+    NumericalDynamics.
+    """
+
+    def __call__(self, state, input, wind):
+        x_dot, (F_wind,), (Q_wind,) = get_python_dynamics("math")(state.tolist(), input.tolist(), float(wind))
+        return np.array(x_dot), F_wind, Q_wind
 
 
 def get_sys(
@@ -136,15 +241,16 @@ def solve_initial_problem(wind):
     return x0, u0
 
 
-def change_random():
-    wind = np.random.uniform(10 * 2 / 3, 25 * 2 / 3)
-    if np.random.rand() < 0.5:
-        power = np.random.uniform(0, 15e6)
-        arr = change_power(wind, power)
+def change_random(rng=None):
+    rng = np.random.default_rng(rng)
+    wind = rng.uniform(10 * 2 / 3, 25 * 2 / 3)
+    if rng.random() < 0.5:
+        power = rng.uniform(0, 15e6)
+        arr = change_power(wind, power, rng=rng)
         arr = np.vstack([arr, power])
     else:
-        pitch = np.random.uniform(-4 * DEG2RAD, 20 * DEG2RAD)
-        arr = change_power(wind, pitch)
+        pitch = rng.uniform(-4 * DEG2RAD, 20 * DEG2RAD)
+        arr = change_blade_pitch(wind, pitch, rng=rng)
         arr = np.vstack([arr[:4], pitch, arr[-1]])
     arr = np.vstack([arr, wind])
     if any(np.isnan(arr)):
@@ -152,9 +258,9 @@ def change_random():
     return arr
 
 
-def change_power(wind, power):
+def change_power(wind, power, rng=None):
     Hz, hz = Hh_from_disconnected_constraints(np.vstack([sys_lub_x, sys_lub_u[:-1]]))
-    v0 = sample_inside_polytope(Hz, hz)
+    v0 = sample_inside_polytope(Hz, hz, rng=rng)
     # print(f"\nWind:\t{wind}")
     try:
         return steady_state(symbolic_x_dot,
@@ -165,9 +271,9 @@ def change_power(wind, power):
         return np.vstack([np.nan] * Hz.shape[-1])
 
 
-def change_blade_pitch(wind, pitch):
+def change_blade_pitch(wind, pitch, rng=None):
     Hz, hz = Hh_from_disconnected_constraints(np.vstack([sys_lub_x, sys_lub_u[[0, 2]]]))
-    v0 = sample_inside_polytope(Hz, hz)
+    v0 = sample_inside_polytope(Hz, hz, rng=rng)
     # print(f"\nWind:\t{wind}")
     try:
         return steady_state(symbolic_x_dot,
@@ -1,8 +1,15 @@
+import logging
+from functools import lru_cache
+
 import numpy as np
+from casadi import SX, Function
 
+import gym_rl_mpc.objects.symbolic_model as sym
 import gym_rl_mpc.utils.geomutils as geom
 import gym_rl_mpc.utils.model_params as params
-from gym_rl_mpc.objects.symbolic_model import solve_initial_problem, numerical_F_wind, numerical_Q_wind, numerical_x_dot
+from gym_rl_mpc.objects.steady_state_map import initial_condition
+from gym_rl_mpc.objects.symbolic_model import NumericalDynamics, PythonDynamics
+from gym_rl_mpc.utils.codegen import function_to_python
 
 
 def odesolver45(f, y, h, wind_speed):
@@ -29,18 +36,115 @@ def odesolver45(f, y, h, wind_speed):
     return w, q
 
 
+def odesolver45_adaptive(step, y, h, tol, h_try=None, max_substeps=1000, h_min=None):
+    """Integrate a time-invariant ODE over one interval of length h with odesolver45 sub-steps.
+    The sub-step length is adapted to keep the difference between the order 4 and order 5 approx. below
+    tol * (1 + |y|), elementwise. A calm interval is covered by a single sub-step.
+    Parameters:
+        step: function. step(y, h) returns the order 4 and order 5 approx. of one odesolver45 step.
+        y: array. Current position.
+        h: float. Interval length.
+        tol: float. Mixed absolute and relative tolerance.
+        h_try: float. First sub-step length to try, defaults to h.
+        h_min: float. Shortest sub-step length, defaults to 1e-6 * h. A sub-step with a non-finite error estimate
+            is rejected and shortened, and a FloatingPointError is raised if it is still non-finite at h_min.
+    Returns:
+        y: array. Accepted order 4 approx. at the end of the interval.
+        h_next: float. Suggested first sub-step length for the next interval, pass it as h_try.
+        n_substeps: int. Number of odesolver45 steps, rejected ones included.
+        error: float. Largest scaled error estimate of the accepted sub-steps, <= 1 unless max_substeps is hit.
+    """
+    t = 0.0
+    h_min = 1e-6 * h if h_min is None else h_min
+    h_sub = h if h_try is None else min(h_try, h)
+    n_substeps = 0
+    error = 0.0
+    while h - t > 1e-12 * h:
+        h_step = min(h_sub, h - t)
+        w, q = step(y, h_step)
+        n_substeps += 1
+        step_error = np.max(np.abs(np.asarray(q) - np.asarray(w)) / (tol * (1 + np.abs(y))))
+        if not np.isfinite(step_error):
+            if h_step <= h_min or n_substeps >= max_substeps:
+                raise FloatingPointError(f"Non-finite odesolver45 error estimate at sub-step length {h_step:.3g}")
+            h_sub = max(0.2 * h_step, h_min)
+            continue
+        accepted = step_error <= 1 or n_substeps >= max_substeps
+        if accepted:
+            t += h_step
+            y = np.asarray(w)
+            error = max(error, step_error)
+        # Standard step size control for an order 4 method, limited to a factor 5 change per sub-step
+        h_new = h_step * (min(5.0, max(0.2, 0.9 * step_error ** -0.2)) if step_error > 0 else 5.0)
+        # A sub-step shortened to end on the interval says nothing about the step size for the next interval
+        h_sub = max(h_sub, h_new) if accepted and h_step < h_sub else h_new
+    return y, h_sub, n_substeps, error
+
+
+def _rk45_step_function():
+    """
+    casadi Function of one odesolver45 step of the turbine dynamics. Besides the order 4 and 5 approximations it
+    returns the values Turbine.state_dot_func sets during the step: state_dot of the first stage, and F_w, Q_w and
+    omega of the last stage.
+    """
+    y = SX.sym('y', sym.x.shape[0])
+    u = SX.sym('u', sym.u.shape[0])
+    w = SX.sym('w')
+    h = SX.sym('h')
+    stages = []
+
+    def f(state, wind):
+        x_dot, F_w, Q_w = sym.get_numerical_dynamics()(state, u, wind)
+        stages.append((state, x_dot, F_w, Q_w))
+        return x_dot
+
+    state_o4, state_o5 = odesolver45(f, y, h, w)
+    last_state, _, F_w, Q_w = stages[-1]
+    return Function("rk45_step",
+                    [y, u, w, h],
+                    [state_o4, state_o5, stages[0][1], F_w, Q_w, last_state[2]],
+                    ["y", "u", "w", "h"],
+                    ["state_o4", "state_o5", "state_dot", "F_w", "Q_w", "omega"])
+
+
+@lru_cache(maxsize=None)
+def get_rk45_step(module="math"):
+    """
+    Python code generated from _rk45_step_function, built on first use.
+    """
+    return function_to_python(_rk45_step_function(), module)
+
+
+def __getattr__(name):
+    if name == "rk45_step_math":
+        return get_rk45_step("math")
+    if name == "rk45_step_numpy":
+        return get_rk45_step("numpy")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+DYNAMICS_BACKENDS = {
+    "casadi": NumericalDynamics,
+    "python": PythonDynamics,
+}
+
+
 class Turbine:
-    def __init__(self, init_wind_speed=3, step_size=1):
+    def __init__(self, init_wind_speed=3, step_size=1, backend="python", integration_tol=None):
         """
             state = [theta, theta_dot, omega]^T
             input = [F_thr, blade_pitch, power]^T
+            backend: "python" evaluates the dynamics through Python code on math floats generated from the
+                symbolic expression, "casadi" through the casadi Function.
+            integration_tol: None for one odesolver45 step per step_size, or the tolerance of
+                odesolver45_adaptive sub-stepping inside each step_size.
         """
 
         self.state = np.zeros(3)                        # Initialize states
         self.state_dot = np.zeros(len(self.state))      # Initialize state_dot
         self.adjusted_wind_speed = params.wind_inflow_ratio * init_wind_speed
 
-        steady_state, u0 = solve_initial_problem(wind=self.adjusted_wind_speed)
+        steady_state, u0 = initial_condition(wind=self.adjusted_wind_speed)
         self.steady_state = steady_state.flatten()
         self.state = self.steady_state
         self.u0 = u0.flatten()
@@ -54,8 +158,15 @@ class Turbine:
         self.power_regime = params.power_regime
         self.max_power_generation = params.max_power_generation
 
-        self.F_w = numerical_F_wind(self.omega, self.adjusted_wind_speed, self.input[1])
-        self.Q_w = numerical_Q_wind(self.omega, self.adjusted_wind_speed, self.input[1])
+        if backend not in DYNAMICS_BACKENDS:
+            raise ValueError(f"{backend} is not a implemented backend")
+        self.backend = backend
+        self._dynamics = DYNAMICS_BACKENDS[backend]()
+        self.integration_tol = integration_tol
+        self._h_try = step_size
+        self.n_substeps = 0          # odesolver45 steps spent on the last step
+        self.integration_error = 0   # Largest |order 5 - order 4| / (1 + |state|) of the last step
+        _, self.F_w, self.Q_w = self._dynamics(self.state, self.input, self.adjusted_wind_speed)
         self.Q_g = max(0, min(init_power / self.omega, params.max_generator_torque))
 
     def step(self, action, wind_speed):
@@ -83,29 +194,62 @@ class Turbine:
         self._sim(self.adjusted_wind_speed)
 
     def _sim(self, adjusted_wind_speed):
-        self.state_dot = self.state_dot_func(self.state, adjusted_wind_speed)
-        state_o4, state_o5 = odesolver45(self.state_dot_func, self.state, self.step_size, adjusted_wind_speed)
-        
+        if self.backend == "python":
+            def step(state, h):
+                # The whole RK45 step as generated scalar code, without intermediate arrays
+                state_o4, state_o5, state_dot, (self.F_w,), (self.Q_w,), (omega,) = get_rk45_step("math")(
+                    state.tolist(), self.input.tolist(), float(adjusted_wind_speed), h)
+                self.Q_g = max(0, min(self.input[2] / omega, params.max_generator_torque))
+                # The first sub-step starts at self.state
+                if self.state_dot is None:
+                    self.state_dot = np.array(state_dot)
+                return np.array(state_o4), np.array(state_o5)
+            self.state_dot = None
+        else:
+            self.state_dot = self.state_dot_func(self.state, adjusted_wind_speed)
+
+            def step(state, h):
+                return odesolver45(self.state_dot_func, state, h, adjusted_wind_speed)
+
+        if self.integration_tol is None:
+            state_o4, state_o5 = step(self.state, self.step_size)
+            self.n_substeps = 1
+            self.integration_error = np.max(np.abs(state_o5 - state_o4) / (1 + np.abs(self.state)))
+        else:
+            state_o4, self._h_try, self.n_substeps, error = odesolver45_adaptive(
+                step, self.state, self.step_size, self.integration_tol, self._h_try)
+            self.integration_error = error * self.integration_tol
+        logging.debug("Turbine step: %d odesolver45 steps, error estimate %.3g", self.n_substeps, self.integration_error)
 
         self.state = state_o4
         self.state[0] = geom.ssa(self.state[0])
 
+    def snapshot(self):
+        """
+        Copy of everything that changes in step: state, low pass filtered input, wind forces and the
+        adaptive step length. restore puts a turbine of the same step_size and backend back in this state.
+        """
+        return (self.state.copy(), self.state_dot.copy(), self.input.copy(), self.adjusted_wind_speed, self.F_w,
+                self.Q_w, self.Q_g, self._h_try, self.n_substeps, self.integration_error)
+
+    def restore(self, snapshot):
+        state, state_dot, input, self.adjusted_wind_speed, self.F_w, self.Q_w, self.Q_g, self._h_try, \
+            self.n_substeps, self.integration_error = snapshot
+        self.state = state.copy()
+        self.state_dot = state_dot.copy()
+        self.input = input.copy()
+
     def state_dot_func(self, state, adjusted_wind_speed):
         """
         state = [theta, theta_dot, omega]^T
         """
 
-        F_thr = self.input[0]
-        u = self.input[1]
         power = self.input[2]
         omega = state[2]
 
-        self.F_w = numerical_F_wind(omega, adjusted_wind_speed, u)
-        self.Q_w = numerical_Q_wind(omega, adjusted_wind_speed, u)
+        state_dot, self.F_w, self.Q_w = self._dynamics(state, self.input, adjusted_wind_speed)
         self.Q_g = max(0, min(power / omega, params.max_generator_torque))
 
-        state_dot = numerical_x_dot(state, u, F_thr, power, adjusted_wind_speed)
-
         return state_dot
 
     @property
@@ -162,6 +306,160 @@ class Turbine:
         return params.max_thrust_force
 
 
+class TurbineBatch:
+    def __init__(self, init_wind_speeds, step_size=1):
+        """
+        M turbines simulated together, with the same dynamics as Turbine(backend="python").
+            state = (M, 3) array of [theta, theta_dot, omega]
+            input = (M, 3) array of [F_thr, blade_pitch, power]
+        batch[i] gives a read-only view of turbine i with the properties of Turbine.
+        """
+        n = len(init_wind_speeds)
+        self.step_size = step_size
+        self.state = np.zeros((n, 3))
+        self.state_dot = np.zeros((n, 3))
+        self.input = np.zeros((n, 3))
+        self.adjusted_wind_speed = np.zeros(n)
+        self.F_w = np.zeros(n)
+        self.Q_w = np.zeros(n)
+        self.Q_g = np.zeros(n)
+
+        self.alpha = self.step_size / (self.step_size + np.array([params.tau_thr,
+                                                                   params.tau_blade_pitch,
+                                                                   params.tau_power]))
+        self.omega_setpoint = params.omega_setpoint
+        self.power_regime = params.power_regime
+        self.max_power_generation = params.max_power_generation
+
+        self.reset(np.arange(n), init_wind_speeds)
+
+    def __len__(self):
+        return self.state.shape[0]
+
+    def __getitem__(self, i):
+        return TurbineView(self, i)
+
+    def reset(self, indices, wind_speeds):
+        """
+        Puts the turbines at indices in steady state for the given wind speeds.
+        """
+        indices = np.asarray(indices, dtype=int)
+        adjusted_wind_speeds = params.wind_inflow_ratio * np.asarray(wind_speeds, dtype=float)
+        for i, adjusted_wind_speed in zip(indices, adjusted_wind_speeds):
+            steady_state, u0 = initial_condition(wind=adjusted_wind_speed)
+            self.state[i] = steady_state.flatten()
+            self.input[i] = u0.flatten()
+        self.state_dot[indices] = 0
+        self.adjusted_wind_speed[indices] = adjusted_wind_speeds
+
+        _, (F_w,), (Q_w,) = sym.get_python_dynamics("numpy")(self.state[indices].T, self.input[indices].T,
+                                                             adjusted_wind_speeds)
+        self.F_w[indices] = F_w
+        self.Q_w[indices] = Q_w
+        self.Q_g[indices] = np.clip(self.input[indices, 2] / self.state[indices, 2], 0, params.max_generator_torque)
+
+    def step(self, actions, wind_speeds):
+        """
+        Steps all turbines with the (M, 3) normalized actions and the (M,) wind speeds.
+        """
+        commanded = np.asarray(actions) * np.array([params.max_thrust_force,
+                                                    params.max_blade_pitch,
+                                                    params.max_power_generation])
+        # Low pass on thrust force, blade pitch and power
+        self.input = self.alpha * commanded + (1 - self.alpha) * self.input
+
+        # Adjust wind speed based on inflow and structure. Relative axial flux w = w_0 - w_i - x_dot = (2/3)w_0 - x_dot
+        self.adjusted_wind_speed = params.wind_inflow_ratio * np.asarray(wind_speeds) - params.L * np.cos(
+            self.platform_angle) * self.state[:, 1]
+
+        self._sim(self.adjusted_wind_speed)
+
+    def _sim(self, adjusted_wind_speed):
+        state_o4, state_o5, state_dot, (self.F_w,), (self.Q_w,), (omega,) = get_rk45_step("numpy")(
+            self.state.T, self.input.T, adjusted_wind_speed, self.step_size)
+        self.Q_g = np.clip(self.input[:, 2] / omega, 0, params.max_generator_torque)
+        self.state_dot = np.stack(state_dot, axis=-1)
+        self.state = np.stack(state_o4, axis=-1)
+        self.state[:, 0] = geom.ssa(self.state[:, 0])
+
+    @property
+    def platform_angle(self):
+        return geom.ssa(self.state[:, 0])
+
+    @property
+    def omega(self):
+        return self.state[:, 2]
+
+    @property
+    def omega_dot(self):
+        return self.state_dot[:, 2]
+
+    @property
+    def blade_pitch(self):
+        return self.input[:, 1]
+
+    @property
+    def wind_force(self):
+        return self.F_w
+
+    @property
+    def wind_torque(self):
+        return self.Q_w
+
+    @property
+    def generator_torque(self):
+        return self.Q_g
+
+    @property
+    def max_thrust_force(self):
+        return params.max_thrust_force
+
+
+class TurbineView(Turbine):
+    """
+    Read-only view of turbine i in a TurbineBatch, with the properties of Turbine.
+    """
+    omega_setpoint = staticmethod(params.omega_setpoint)
+    power_regime = staticmethod(params.power_regime)
+    max_power_generation = params.max_power_generation
+
+    def __init__(self, batch, i):
+        self.batch = batch
+        self.i = i
+
+    @property
+    def step_size(self):
+        return self.batch.step_size
+
+    @property
+    def state(self):
+        return self.batch.state[self.i]
+
+    @property
+    def state_dot(self):
+        return self.batch.state_dot[self.i]
+
+    @property
+    def input(self):
+        return self.batch.input[self.i]
+
+    @property
+    def adjusted_wind_speed(self):
+        return self.batch.adjusted_wind_speed[self.i]
+
+    @property
+    def F_w(self):
+        return self.batch.F_w[self.i]
+
+    @property
+    def Q_w(self):
+        return self.batch.Q_w[self.i]
+
+    @property
+    def Q_g(self):
+        return self.batch.Q_g[self.i]
+
+
 def _un_normalize_thrust_input(input):
     return input * params.max_thrust_force
 
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import numpy as np
+
+# IEC 61400-1 turbulence scale parameter for hub heights above 60 m [m]
+TURBULENCE_SCALE = 42
+EOG_DURATION = 10.5  # Duration of the IEC extreme operating gust [s]
+
+
+def _time(n_steps, step_size):
+    return np.arange(n_steps) * step_size
+
+
+def sinusoidal_wind(n_steps, step_size, mean, amplitude=0, period=60, phase_shift=0):
+    """
+    amplitude*sin(2*pi*t/period + phase_shift) + mean at t = k*step_size, k = 0, ..., n_steps - 1.
+    mean, amplitude and phase_shift may be arrays of shape (M,), giving M series of shape (M, n_steps).
+    """
+    mean, amplitude, phase_shift = (np.asarray(a, dtype=float)[..., None] for a in (mean, amplitude, phase_shift))
+    return amplitude * np.sin((2 * np.pi / period) * _time(n_steps, step_size) + phase_shift) + mean
+
+
+def turbulence_spectrum(f, mean, intensity, spectrum="kaimal"):
+    """
+    One-sided power spectral density [(m/s)^2/Hz] of the longitudinal turbulence at frequencies f,
+    with the IEC 61400-1 Kaimal or von Karman model and standard deviation intensity*mean.
+    """
+    sigma = intensity * mean
+    if spectrum == "kaimal":
+        length = 8.1 * TURBULENCE_SCALE
+        return sigma ** 2 * 4 * length / mean / (1 + 6 * f * length / mean) ** (5 / 3)
+    elif spectrum == "von_karman":
+        length = 3.5 * TURBULENCE_SCALE
+        return sigma ** 2 * 4 * length / mean / (1 + 70.8 * (f * length / mean) ** 2) ** (5 / 6)
+    else:
+        raise ValueError(f"{spectrum} is not a implemented turbulence spectrum")
+
+
+def turbulence(n_steps, step_size, mean, intensity, rng, spectrum="kaimal"):
+    """
+    Zero mean turbulence of shape (M, n_steps) for M mean wind speeds (or (1, n_steps) for a scalar mean),
+    synthesized with one inverse FFT as a sum of cosines with the spectrum amplitudes and random phases.
+    """
+    mean = np.atleast_1d(np.asarray(mean, dtype=float))[:, None]
+    f = np.fft.rfftfreq(n_steps, step_size)[1:]
+    df = 1 / (n_steps * step_size)
+    amplitudes = np.sqrt(2 * turbulence_spectrum(f, mean, intensity, spectrum) * df)
+    phases = rng.uniform(0, 2 * np.pi, amplitudes.shape)
+    coefficients = np.zeros((mean.shape[0], f.shape[0] + 1), dtype=complex)
+    coefficients[:, 1:] = n_steps / 2 * amplitudes * np.exp(1j * phases)
+    return np.fft.irfft(coefficients, n_steps, axis=-1)
+
+
+def gust(n_steps, step_size, amplitude, start, duration=EOG_DURATION):
+    """
+    IEC extreme operating gust shape, -0.37*amplitude*sin(3*pi*t/T)*(1 - cos(2*pi*t/T)) for 0 <= t - start <= T,
+    zero elsewhere. amplitude and start may be arrays of shape (M,).
+    """
+    amplitude, start = (np.asarray(a, dtype=float)[..., None] for a in (amplitude, start))
+    t = _time(n_steps, step_size) - start
+    shape = -0.37 * np.sin(3 * np.pi * t / duration) * (1 - np.cos(2 * np.pi * t / duration))
+    return np.where((t >= 0) & (t <= duration), amplitude * shape, 0)
+
+
+def wind_series(n_steps, step_size, rng, mean, amplitude=0, period=60, phase_shift=0, noise_std=0, spectrum=None,
+                turbulence_intensity=0, gust_amplitude=0, min_wind_speed=0, max_wind_speed=np.inf):
+    """
+    Wind speed at every step of an episode: a sine, white noise with std noise_std, turbulence from the
+    spectrum "kaimal", "von_karman" or None and, if gust_amplitude > 0, one gust at a random time,
+    clipped to [min_wind_speed, max_wind_speed].
+    mean, amplitude and phase_shift may be arrays of shape (M,) for M series, else the result has shape (n_steps,).
+    rng may be a numpy Generator or RandomState.
+    """
+    batched = np.ndim(mean) > 0
+    mean = np.atleast_1d(mean)
+    wind = sinusoidal_wind(n_steps, step_size, mean, amplitude, period, phase_shift)
+    if noise_std:
+        wind = wind + rng.normal(0, noise_std, wind.shape)
+    if spectrum is not None:
+        wind = wind + turbulence(n_steps, step_size, mean, turbulence_intensity, rng, spectrum)
+    if gust_amplitude:
+        start = rng.uniform(0, max(n_steps * step_size - EOG_DURATION, 0), wind.shape[0])
+        wind = wind + gust(n_steps, step_size, gust_amplitude, start)
+    wind = np.clip(wind, min_wind_speed, max_wind_speed)
+    return wind if batched else wind[0]
+
+
+_wind_records = {}
+
+
+def load_wind_record(path):
+    """
+    The 1d array of wind speeds in the .npy file at path, memory-mapped read-only and shared by every env of the
+    process. Only the pages of the windows that are read are loaded, and the OS page cache is shared between
+    processes, so memory use does not grow with the length of the record or the number of workers.
+    """
+    path = str(Path(path).resolve())
+    if path not in _wind_records:
+        record = np.load(path, mmap_mode='r')
+        if record.ndim != 1:
+            raise ValueError(f"{path} must hold a 1d array of wind speeds, not shape {record.shape}")
+        _wind_records[path] = record
+    return _wind_records[path]
+
+
+def record_windows(record, record_step_size, n_steps, step_size, rng, n_windows=None):
+    """
+    Windows of n_steps wind speeds every step_size seconds from random starts in record, sampled every
+    record_step_size seconds and linearly interpolated between samples.
+    Returns an (n_windows, n_steps) array, or (n_steps,) if n_windows is None.
+    rng may be a numpy Generator or RandomState.
+    """
+    offsets = np.arange(n_steps) * (step_size / record_step_size)
+    max_start = record.shape[0] - 1 - int(np.ceil(offsets[-1]))
+    if max_start < 0:
+        raise ValueError(f"A wind record of {record.shape[0]} samples is shorter than an episode")
+    starts = np.floor(rng.uniform(0, max_start + 1, 1 if n_windows is None else n_windows)).astype(int)
+    position = starts[:, None] + offsets
+    i = np.minimum(np.floor(position).astype(int), record.shape[0] - 2)
+    weight = position - i
+    windows = (1 - weight) * record[i] + weight * record[i + 1]
+    return windows[0] if n_windows is None else windows
@@ -1,4 +1,6 @@
 import os
+import time
+from collections import deque
 
 import numpy as np
 from pandas import DataFrame
@@ -96,6 +98,114 @@ def format_history(env, lastn=-1):
 
     return df
 
+# Column of the training report and the history key it is taken from
+REPORT_COLUMNS = {
+    r"episode": 'episode_num',
+    r"reward": 'reward',
+    r"crash": 'crashed',
+    r"no_crash": None,
+    r"crash_cause": 'crash_cause',
+    r"theta": 'avg_abs_theta',
+    r"theta_dot": 'avg_abs_theta_dot',
+    r"std_theta": 'std_theta',
+    r"timesteps": 'timesteps',
+    r"duration": 'duration',
+    r"wind_speed": 'wind_speed',
+    r"theta_reward": 'theta_reward',
+    r"theta_dot_reward": 'theta_dot_reward',
+    r"omega_reward": 'omega_reward',
+    r"omega_dot_reward": 'omega_dot_reward',
+    r"power_reward": 'power_reward',
+    r"psf_reward": 'psf_reward',
+    r"psf_error": 'psf_error',
+}
+
+
+class ReportWriter:
+    def __init__(self, report_dir, flush_interval=30, flush_size=10000):
+        """
+        Buffers the episode histories of a training run and appends them to report_dir/history_data.arrow
+        as one Arrow IPC record batch per flush, with the columns of format_history.
+        Flushes every flush_interval seconds or flush_size episodes, and on close.
+        Without pyarrow the rows are appended to report_dir/history_data.csv instead.
+        Read the report with read_report.
+        """
+        self.report_dir = report_dir
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._writer = None
+        try:
+            import pyarrow
+            self._arrow = pyarrow
+            self.file_path = os.path.join(report_dir, "history_data.arrow")
+        except ImportError:
+            self._arrow = None
+            self.file_path = os.path.join(report_dir, "history_data.csv")
+
+    def add(self, history):
+        """
+        Buffers the history dict of one episode.
+        """
+        self._rows.append(tuple(1 - history['crashed'] if key is None else history[key]
+                                for key in REPORT_COLUMNS.values()))
+        if len(self._rows) >= self.flush_size or time.monotonic() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        columns = np.array(self._rows, dtype=np.float64).T
+        self._rows = []
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            if self._arrow is not None:
+                batch = self._arrow.record_batch(list(columns), names=list(REPORT_COLUMNS))
+                if self._writer is None:
+                    self._writer = self._arrow.ipc.new_stream(self.file_path, batch.schema)
+                self._writer.write_batch(batch)
+            else:
+                write_header = not os.path.isfile(self.file_path)
+                with open(self.file_path, 'a') as f:
+                    np.savetxt(f, columns.T, delimiter=',', header=','.join(REPORT_COLUMNS) if write_header else '',
+                               comments='')
+        except PermissionError as e:
+            print('Warning: Report files are open - could not update report: ' + str(repr(e)))
+        except OSError as e:
+            print('Warning: Ignoring OSError: ' + str(repr(e)))
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def read_report(report_dir):
+    """
+    The episodes written by ReportWriter to report_dir as a DataFrame with the columns of format_history.
+    Record batches written before an interrupted run are read up to the last complete one.
+    """
+    arrow_path = os.path.join(report_dir, "history_data.arrow")
+    if os.path.isfile(arrow_path):
+        import pyarrow
+
+        batches = []
+        with pyarrow.OSFile(arrow_path) as f:
+            reader = pyarrow.ipc.open_stream(f)
+            try:
+                for batch in reader:
+                    batches.append(batch)
+            except pyarrow.ArrowInvalid:
+                pass
+        if not batches:
+            return DataFrame(columns=list(REPORT_COLUMNS))
+        return pyarrow.Table.from_batches(batches).to_pandas()
+    from pandas import read_csv
+    return read_csv(os.path.join(report_dir, "history_data.csv"))
+
 def report(env, report_dir):
     try:
         os.makedirs(report_dir, exist_ok=True)
@@ -112,6 +222,41 @@ def report(env, report_dir):
     except OSError as e:
         print('Warning: Ignoring OSError: ' + str(repr(e)))
 
+def report_total_history(histories, report_dir, lastn=100, chunk_size=10000):
+    """
+    Writes total_history_data.csv and the summary of the last lastn episodes to report_dir from an iterable of
+    episode history dicts, e.g. iter_spilled_histories, chunk_size episodes at a time.
+    Returns the number of episodes.
+    """
+    class Struct(object): pass
+    chunk_env = Struct()
+    chunk_env.history = []
+    last_episodes = deque(maxlen=lastn)
+    os.makedirs(report_dir, exist_ok=True)
+    file_path = os.path.join(report_dir, "total_history_data.csv")
+    num_episodes = 0
+
+    def write_chunk():
+        df = format_history(chunk_env)
+        df.index += num_episodes - len(chunk_env.history)
+        df.to_csv(file_path, mode='w' if num_episodes == len(chunk_env.history) else 'a',
+                  header=num_episodes == len(chunk_env.history))
+        chunk_env.history = []
+
+    for history in histories:
+        chunk_env.history.append(history)
+        last_episodes.append(history)
+        num_episodes += 1
+        if len(chunk_env.history) >= chunk_size:
+            write_chunk()
+    if chunk_env.history:
+        write_chunk()
+
+    if num_episodes > 0:
+        chunk_env.history = list(last_episodes)
+        make_summary_file(format_history(chunk_env), report_dir, num_episodes)
+    return num_episodes
+
 def make_summary_file(data, report_dir, total_num_episodes):
     os.makedirs(report_dir, exist_ok=True)
 
@@ -0,0 +1,99 @@
+import numpy as np
+import torch as th
+from gym import spaces
+from stable_baselines3 import PPO
+from stable_baselines3.common.utils import obs_as_tensor
+
+
+class AsyncPPO(PPO):
+    """
+    PPO that collects its rollouts with the asynchronous send/recv of SharedMemoryVecEnv: every recv returns the
+    first env_batch_size of the n_envs envs that are done with their step, and only those get their next action.
+    Envs with slow PSF solves then do not hold back the others, except at the end of each rollout.
+    The rollout buffer keeps one column per env and every env fills its column in its own order, so the
+    returns and advantages are computed over the trajectory of each env as in PPO.
+    With env_batch_size None or an env without send/recv, the rollouts are collected as in PPO.
+    The callbacks are called once per recv, so every env_batch_size timesteps instead of every n_envs, and
+    step counts like the save_freq of CheckpointCallback have to be scaled by n_envs / env_batch_size.
+    :param env_batch_size: Number of envs received per recv, at most the number of envs
+    """
+
+    def __init__(self, *args, env_batch_size=None, **kwargs):
+        self.env_batch_size = env_batch_size
+        super().__init__(*args, **kwargs)
+
+    def collect_rollouts(self, env, callback, rollout_buffer, n_rollout_steps):
+        if self.env_batch_size is None or not hasattr(env, 'recv'):
+            return super().collect_rollouts(env, callback, rollout_buffer, n_rollout_steps)
+        assert self._last_obs is not None, "No previous observation was provided"
+        self.policy.set_training_mode(False)
+
+        n_envs = env.num_envs
+        rollout_buffer.reset()
+        if self.use_sde:
+            self.policy.reset_noise(n_envs)
+        callback.on_rollout_start()
+
+        last_obs = np.array(self._last_obs)
+        episode_starts = np.array(self._last_episode_starts, dtype=bool)
+        # Transitions of each env in the rollout buffer
+        n_steps = np.zeros(n_envs, dtype=int)
+
+        def send(env_ids):
+            # Everything of the transitions of env_ids but the rewards, which are added when received
+            with th.no_grad():
+                actions, values, log_probs = self.policy(obs_as_tensor(last_obs[env_ids], self.device))
+            actions = actions.cpu().numpy()
+            clipped_actions = actions
+            if isinstance(self.action_space, spaces.Box):
+                clipped_actions = np.clip(actions, self.action_space.low, self.action_space.high)
+            if isinstance(self.action_space, spaces.Discrete):
+                actions = actions.reshape(-1, 1)
+            pos = n_steps[env_ids]
+            rollout_buffer.observations[pos, env_ids] = last_obs[env_ids]
+            rollout_buffer.actions[pos, env_ids] = actions
+            rollout_buffer.episode_starts[pos, env_ids] = episode_starts[env_ids]
+            rollout_buffer.values[pos, env_ids] = values.cpu().numpy().flatten()
+            rollout_buffer.log_probs[pos, env_ids] = log_probs.cpu().numpy()
+            env.send(clipped_actions, env_ids)
+
+        send(np.arange(n_envs))
+        n_in_flight = n_envs
+        while n_in_flight:
+            new_obs, rewards, dones, infos, env_ids = env.recv(min(self.env_batch_size, n_in_flight))
+            n_in_flight -= len(env_ids)
+            self.num_timesteps += len(env_ids)
+
+            # Give access to local variables
+            callback.update_locals(locals())
+            if callback.on_step() is False:
+                # The workers can not be left with steps in flight
+                if n_in_flight:
+                    env.recv(n_in_flight)
+                return False
+
+            self._update_info_buffer(infos)
+            rollout_buffer.rewards[n_steps[env_ids], env_ids] = rewards
+            n_steps[env_ids] += 1
+            last_obs[env_ids] = new_obs
+            episode_starts[env_ids] = dones
+
+            env_ids = env_ids[n_steps[env_ids] < n_rollout_steps]
+            if env_ids.size:
+                send(env_ids)
+                n_in_flight += len(env_ids)
+
+        rollout_buffer.pos = rollout_buffer.buffer_size
+        rollout_buffer.full = True
+        self._last_obs = last_obs
+        self._last_episode_starts = episode_starts
+
+        with th.no_grad():
+            # Compute value for the last timestep
+            values = self.policy.predict_values(obs_as_tensor(last_obs, self.device))
+
+        rollout_buffer.compute_returns_and_advantage(last_values=values, dones=episode_starts)
+
+        callback.on_rollout_end()
+
+        return True
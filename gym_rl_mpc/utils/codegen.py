@@ -0,0 +1,112 @@
+import math
+
+import casadi
+
+_BINARY_OPS = {
+    casadi.OP_ADD: "{0} + {1}",
+    casadi.OP_SUB: "{0} - {1}",
+    casadi.OP_MUL: "{0} * {1}",
+    casadi.OP_DIV: "{0} / {1}",
+    casadi.OP_POW: "{0} ** {1}",
+    casadi.OP_CONSTPOW: "{0} ** {1}",
+}
+
+# math.pow raises ValueError for a negative base and a fractional exponent, where ** returns a complex number
+_MATH_BINARY_OPS = {**_BINARY_OPS, casadi.OP_POW: "math.pow({0}, {1})", casadi.OP_CONSTPOW: "math.pow({0}, {1})"}
+
+_UNARY_OPS = {
+    casadi.OP_ASSIGN: "{0}",
+    casadi.OP_NEG: "-{0}",
+    casadi.OP_SQ: "{0} * {0}",
+    casadi.OP_TWICE: "2.0 * {0}",
+    casadi.OP_INV: "1.0 / {0}",
+}
+
+# Functions with the same name in math and numpy
+_FUNCTIONS = {
+    casadi.OP_SIN: "sin",
+    casadi.OP_COS: "cos",
+    casadi.OP_TAN: "tan",
+    casadi.OP_EXP: "exp",
+    casadi.OP_LOG: "log",
+    casadi.OP_SQRT: "sqrt",
+    casadi.OP_FABS: "fabs",
+    casadi.OP_TANH: "tanh",
+}
+
+
+def python_source(f, name, module="numpy"):
+    """
+    Generates the source of a plain Python function evaluating the casadi SX Function f.
+    The generated function takes the inputs of f in order, indexing vector inputs and using scalar inputs as is,
+    and returns one tuple of elements per output.
+    With module="math" it evaluates Python floats fast, with module="numpy" the inputs may be arrays,
+    e.g. x of shape (nx, M), and every element is evaluated for all M columns at once.
+    With module="math", divisions by zero, domain errors of sqrt, log and pow, and overflows raise
+    ArithmeticError or ValueError, where casadi returns inf or NaN. function_to_python falls back to f for those.
+    """
+    if module not in ("math", "numpy"):
+        raise ValueError(f"{module} is not a supported module")
+    for i in range(f.n_out()):
+        if f.size2_out(i) != 1:
+            raise NotImplementedError("Only column vector outputs are supported")
+
+    args = [f"i{i}" for i in range(f.n_in())]
+    outputs = [["0.0"] * f.size1_out(i) for i in range(f.n_out())]
+    rows = [f.sparsity_out(i).row() for i in range(f.n_out())]
+
+    binary_ops = _MATH_BINARY_OPS if module == "math" else _BINARY_OPS
+    lines = [f"def {name}({', '.join(args)}):"]
+    for k in range(f.n_instructions()):
+        op = f.instruction_id(k)
+        i = f.instruction_input(k)
+        o = f.instruction_output(k)
+        if op == casadi.OP_CONST:
+            value = float(f.instruction_constant(k))
+            # repr gives the undefined names inf and nan for non-finite values
+            lines.append(f"    w{o[0]} = {value!r}" if math.isfinite(value) else f"    w{o[0]} = float('{value!r}')")
+        elif op == casadi.OP_INPUT:
+            arg = args[i[0]] if f.numel_in(i[0]) == 1 else f"{args[i[0]]}[{i[1]}]"
+            lines.append(f"    w{o[0]} = {arg}")
+        elif op == casadi.OP_OUTPUT:
+            name_o = f"o{o[0]}_{o[1]}"
+            lines.append(f"    {name_o} = w{i[0]}")
+            outputs[o[0]][rows[o[0]][o[1]]] = name_o
+        elif op in binary_ops:
+            lines.append(f"    w{o[0]} = " + binary_ops[op].format(f"w{i[0]}", f"w{i[1]}"))
+        elif op in _UNARY_OPS:
+            lines.append(f"    w{o[0]} = " + _UNARY_OPS[op].format(f"w{i[0]}"))
+        elif op in _FUNCTIONS:
+            lines.append(f"    w{o[0]} = {module}.{_FUNCTIONS[op]}(w{i[0]})")
+        else:
+            raise NotImplementedError(f"casadi operation {op} is not supported")
+
+    # Every output is followed by a comma, so a single output is also returned as a tuple of one tuple
+    lines.append("    return " + "".join("(" + "".join(f"{e}, " for e in out) + "), " for out in outputs))
+    return "\n".join(lines) + "\n"
+
+
+def function_to_python(f, module="numpy"):
+    """
+    Compiles python_source(f) into a Python function, see python_source.
+    With module="math", inputs the generated code raises ArithmeticError or ValueError for are evaluated with f
+    instead, so the result has the inf and NaN of casadi.
+    """
+    name = f.name()
+    source = python_source(f, name, module)
+    namespace = {module: __import__(module)}
+    exec(compile(source, f"<generated {module} {name}>", "exec"), namespace)
+    generated = namespace[name]
+    if module == "math":
+        fast = generated
+
+        def generated(*args):
+            try:
+                return fast(*args)
+            except (ArithmeticError, ValueError):
+                outputs = f(*args)
+                outputs = outputs if isinstance(outputs, (tuple, list)) else [outputs]
+                return tuple(tuple(casadi.DM(o).full().ravel().tolist()) for o in outputs)
+        generated.__name__ = name
+    generated.source = source
+    return generated
@@ -0,0 +1,105 @@
+import atexit
+import itertools
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+CRASH_DIR = Path("logs", "debug")
+CRASH_LABELS = [r"crash_cause", r"psf_error", r"theta", r"theta_dot", r"omega", r"agent_F_thr",
+                r"agent_blade_pitch", r"agent_power", r"psf_F_thr", r"psf_blade_pitch", r"psf_power",
+                r"wind_speed", r"adjusted_wind_speed"]
+
+_logger_ids = itertools.count()
+
+
+class CrashLogger:
+    def __init__(self, report_dir=CRASH_DIR, flush_size=64, flush_interval=5.0):
+        """
+        Buffers crash records in memory and appends them from a background thread to a binary file of float64
+        rows of CRASH_LABELS. Every logger has its own file, so parallel workers never write to the same file.
+        merge_crash_logs collects the files of all loggers in report_dir.
+            flush_size: number of buffered records that triggers a flush
+            flush_interval: seconds between flushes of a partly filled buffer
+        """
+        self.file_path = Path(report_dir, f"crash_data_{os.getpid()}_{next(_logger_ids)}.bin")
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def log(self, record):
+        """
+        Buffers one record with the values of CRASH_LABELS.
+        """
+        with self._lock:
+            self._buffer.append(np.asarray(record, dtype=np.float64))
+            n_buffered = len(self._buffer)
+        if self._thread is None:
+            # The thread is only started in workers that crash
+            self._thread = threading.Thread(target=self._run, name="CrashLogger", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        if n_buffered >= self.flush_size:
+            self._flush_event.set()
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered records to the file.
+        """
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return
+        try:
+            os.makedirs(self.file_path.parent, exist_ok=True)
+            with open(self.file_path, "ab") as f:
+                np.vstack(records).tofile(f)
+        except OSError as e:
+            print('Warning: Could not write crash data, dropping ' + str(len(records)) + ' records: ' + str(repr(e)))
+
+    def close(self):
+        """
+        Stops the background thread and writes the remaining records.
+        """
+        if self._thread is not None:
+            self._closed.set()
+            self._flush_event.set()
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+
+
+def merge_crash_logs(report_dir=CRASH_DIR, file_name="crash_data.csv"):
+    """
+    Collects the records of all CrashLogger files in report_dir into one DataFrame with the columns CRASH_LABELS,
+    ordered by the pid and logger number of the files, and writes it to report_dir/file_name if file_name is not
+    None.
+    """
+    from pandas import DataFrame
+
+    # Sorted as numbers, crash_data_1_10.bin comes after crash_data_1_2.bin
+    paths = sorted(Path(report_dir).glob("crash_data_*_*.bin"),
+                   key=lambda path: tuple(int(i) for i in path.stem.split("_")[-2:]))
+    data = []
+    for path in paths:
+        values = np.fromfile(path, dtype=np.float64)
+        # Drop a partly written last record of a killed worker
+        n_records = values.shape[0] // len(CRASH_LABELS)
+        data.append(values[:n_records * len(CRASH_LABELS)].reshape((n_records, len(CRASH_LABELS))))
+    data = np.vstack(data) if data else np.zeros((0, len(CRASH_LABELS)))
+    df = DataFrame(data, columns=CRASH_LABELS)
+    if file_name is not None:
+        df.to_csv(Path(report_dir, file_name))
+    return df
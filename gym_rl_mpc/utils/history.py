@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import os
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from gym_rl_mpc.utils.reward import REWARD_COMPONENTS
+
+# Keys of the episode history of BaseTurbineEnv.save_latest_episode, in order
+HISTORY_KEYS = ['episode_num', 'avg_abs_theta', 'std_theta', 'avg_abs_theta_dot', 'crashed', 'reward', 'timesteps',
+                'duration', 'wind_speed'] + REWARD_COMPONENTS + ['psf_error', 'avg_substeps',
+                                                                 'max_integration_error', 'crash_cause']
+
+_history_ids = itertools.count()
+
+
+class EpisodeHistory:
+    def __init__(self, maxlen=1000, spill_dir=None, spill_size=256):
+        """
+        The latest maxlen episode histories of an env, used like a list.
+        Older episodes are spilled to a float64 binary file of HISTORY_KEYS rows in spill_dir, spill_size
+        episodes at a time, or dropped if spill_dir is None. Every EpisodeHistory has its own file, read them
+        together with iter_spilled_histories.
+        """
+        self._recent = deque()
+        self.maxlen = maxlen
+        self.spill_dir = spill_dir
+        self.spill_size = spill_size
+        self.file_path = None
+        if spill_dir is not None:
+            self.file_path = Path(spill_dir, f"history_{os.getpid()}_{next(_history_ids)}.bin")
+        self._to_spill = []
+        self.n_spilled = 0
+        self.n_dropped = 0
+
+    def append(self, history):
+        self._recent.append(history)
+        if len(self._recent) > self.maxlen:
+            oldest = self._recent.popleft()
+            if self.file_path is None:
+                self.n_dropped += 1
+            else:
+                self._to_spill.append([oldest[key] for key in HISTORY_KEYS])
+                if len(self._to_spill) >= self.spill_size:
+                    self.flush()
+
+    def flush(self):
+        """
+        Writes the episodes waiting to be spilled.
+        """
+        if not self._to_spill:
+            return
+        os.makedirs(self.file_path.parent, exist_ok=True)
+        with open(self.file_path, "ab") as f:
+            np.array(self._to_spill, dtype=np.float64).tofile(f)
+        self.n_spilled += len(self._to_spill)
+        self._to_spill = []
+
+    def spill(self):
+        """
+        Spills every episode, e.g. at the end of training, so the files hold the whole history.
+        """
+        if self.file_path is None:
+            return
+        self._to_spill.extend([history[key] for key in HISTORY_KEYS] for history in self._recent)
+        self._recent.clear()
+        self.flush()
+
+    def __len__(self):
+        return len(self._recent)
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self._recent)[i]
+        return self._recent[i]
+
+
+def _iter_file(path, chunk_size):
+    n_keys = len(HISTORY_KEYS)
+    with open(path, "rb") as f:
+        while True:
+            rows = np.fromfile(f, dtype=np.float64, count=chunk_size * n_keys)
+            if rows.shape[0] < n_keys:
+                return
+            for row in rows[:rows.shape[0] // n_keys * n_keys].reshape((-1, n_keys)):
+                yield dict(zip(HISTORY_KEYS, row.tolist()))
+
+
+def _keyed(path, i, chunk_size):
+    # The episodes of file i with their merge key, episodes with the same number are taken in file order
+    for history in _iter_file(path, chunk_size):
+        yield history['episode_num'], i, history
+
+
+def iter_spilled_histories(spill_dir, chunk_size=4096):
+    """
+    Streams the episode histories of all EpisodeHistory files in spill_dir, reading chunk_size episodes of a
+    file at a time. The episodes of the files are interleaved by episode number, like the total_history of the
+    envs of a vectorized env taken episode by episode.
+    """
+    # Sorted as numbers, history_1_10.bin comes after history_1_2.bin
+    paths = sorted(Path(spill_dir).glob("history_*_*.bin"),
+                   key=lambda path: tuple(int(i) for i in path.stem.split("_")[-2:]))
+    files = [_keyed(path, i, chunk_size) for i, path in enumerate(paths)]
+    for _, _, history in heapq.merge(*files, key=lambda item: item[:2]):
+        yield history
@@ -6,21 +6,20 @@ RAD2RPM = 60/(2*np.pi)
 RPM2RAD = (2*np.pi/60)
 
 def power_regime(wind_speed):
-    if wind_speed < 3:
-        return 0
-    elif wind_speed < 10.59:
-        return (((wind_speed-3)/(10.59-3))**2)
-    else:
-        return 1
+    """
+    Generator power setpoint as a fraction of max_power_generation, for a wind speed or an array of them.
+    """
+    power = np.where(wind_speed < 3, 0, np.where(wind_speed < 10.59, ((wind_speed-3)/(10.59-3))**2, 1))
+    return power if np.ndim(power) else float(power)
 
 
 def omega_setpoint(wind_speed):
-    if wind_speed < 6.98:
-        return 5*RPM2RAD       # 5 rpm
-    elif wind_speed < 10.59:
-        return (((7.55-5)/(10.59-6.98))*(wind_speed-6.98)+5)*RPM2RAD
-    else:
-        return 7.55*RPM2RAD    # 7.55 rpm
+    """
+    Rotor speed setpoint [rad/s], 5 rpm below and 7.55 rpm above rated wind speed, for a wind speed or an array.
+    """
+    rpm = np.where(wind_speed < 6.98, 5, np.where(wind_speed < 10.59, ((7.55-5)/(10.59-6.98))*(wind_speed-6.98)+5,
+                                                  7.55))
+    return rpm*RPM2RAD if np.ndim(rpm) else float(rpm)*RPM2RAD
 
 # Platform parameters
 L = 144.45
@@ -0,0 +1,140 @@
+import numpy as np
+
+from gym_rl_mpc.utils.reward import REWARD_COMPONENTS
+
+RECORDING_LEVELS = ("none", "summary", "full")
+
+# Column name and width of the full trajectory, in the order of BaseTurbineEnv.episode_history
+COLUMNS = {
+    'states': 3,
+    'input': 3,
+    'observations': 5,
+    'time': 1,
+    'last_reward': 1,
+    'wind_force': 1,
+    'wind_torque': 1,
+    'generator_torque': 1,
+    'adjusted_wind_speed': 1,
+    'wind_speed': 1,
+    'n_substeps': 1,
+    'integration_error': 1,
+    **{key: 1 for key in REWARD_COMPONENTS},
+    'agent_actions': 3,
+    'psf_actions': 3,
+}
+
+
+class EpisodeRecorder:
+    def __init__(self, max_steps, level="full"):
+        """
+        Records the steps of one episode of a BaseTurbineEnv.
+            level = "none": nothing is recorded
+                    "summary": running sums for the episode averages of BaseTurbineEnv.save_latest_episode
+                    "full": the summary and every step in preallocated columns of max_steps rows
+        The columns grow if an episode runs longer than max_steps.
+        """
+        if level not in RECORDING_LEVELS:
+            raise ValueError(f"{level} is not a recording level, use one of {RECORDING_LEVELS}")
+        self.level = level
+        self.n = 0
+        self._sums = {}
+        self._max_integration_error = 0.0
+        self._columns = {}
+        if level == "full":
+            self._columns = {key: np.zeros((max_steps, width)) if width > 1 else np.zeros(max_steps)
+                             for key, width in COLUMNS.items()}
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self._sums = {key: 0.0 for key in
+                      ['abs_theta', 'theta', 'theta_sq', 'abs_theta_dot', 'wind_speed', 'n_substeps']
+                      + REWARD_COMPONENTS}
+        self._max_integration_error = 0.0
+
+    def record(self, env):
+        """
+        Records the current step of env.
+        """
+        if self.level == "none":
+            return
+        turbine = env.turbine
+        theta, theta_dot, _ = turbine.state
+        sums = self._sums
+        sums['abs_theta'] += abs(theta)
+        sums['theta'] += theta
+        sums['theta_sq'] += theta * theta
+        sums['abs_theta_dot'] += abs(theta_dot)
+        sums['wind_speed'] += env.wind_speed
+        sums['n_substeps'] += turbine.n_substeps
+        rewards = env.reward_components
+        for key in REWARD_COMPONENTS:
+            sums[key] += rewards[key]
+        self._max_integration_error = max(self._max_integration_error, turbine.integration_error)
+
+        if self.level == "full":
+            if self.n == self._columns['time'].shape[0]:
+                self._grow()
+            n = self.n
+            c = self._columns
+            c['states'][n] = turbine.state
+            c['input'][n] = turbine.input
+            c['observations'][n] = env.observation
+            c['time'][n] = env.t_step * env.step_size
+            c['last_reward'][n] = env.last_reward
+            c['wind_force'][n] = turbine.wind_force
+            c['wind_torque'][n] = turbine.wind_torque
+            c['generator_torque'][n] = turbine.generator_torque
+            c['adjusted_wind_speed'][n] = turbine.adjusted_wind_speed
+            c['wind_speed'][n] = env.wind_speed
+            c['n_substeps'][n] = turbine.n_substeps
+            c['integration_error'][n] = turbine.integration_error
+            for key in REWARD_COMPONENTS:
+                c[key][n] = rewards[key]
+            c['agent_actions'][n] = env.agent_action
+            c['psf_actions'][n] = env.psf_action
+        self.n += 1
+
+    def snapshot(self):
+        """
+        The number of recorded steps and the summary sums. The rows of the full trajectory are not copied,
+        so after restore the rows before the snapshot are only intact if the env has not been reset since.
+        """
+        return self.n, self._sums.copy(), self._max_integration_error
+
+    def restore(self, snapshot):
+        n, sums, self._max_integration_error = snapshot
+        self.n = n
+        self._sums = sums.copy()
+
+    def _grow(self):
+        self._columns = {key: np.concatenate([column, np.zeros_like(column)]) for key, column in
+                         self._columns.items()}
+
+    def summary(self):
+        """
+        Episode averages of the recorded steps, empty if nothing was recorded.
+        """
+        if self.level == "none" or self.n == 0:
+            return {}
+        n = self.n
+        sums = self._sums
+        mean_theta = sums['theta'] / n
+        summary = {
+            'avg_abs_theta': sums['abs_theta'] / n,
+            'std_theta': np.sqrt(max(sums['theta_sq'] / n - mean_theta ** 2, 0)),
+            'avg_abs_theta_dot': sums['abs_theta_dot'] / n,
+            'wind_speed': sums['wind_speed'] / n,
+        }
+        for key in REWARD_COMPONENTS:
+            summary[key] = sums[key] / n
+        summary['avg_substeps'] = sums['n_substeps'] / n
+        summary['max_integration_error'] = self._max_integration_error
+        return summary
+
+    @property
+    def episode_history(self):
+        """
+        Views of the recorded rows of the full trajectory, empty below level "full".
+        """
+        return {key: column[:self.n] for key, column in self._columns.items()}
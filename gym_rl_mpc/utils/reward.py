@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+
+REWARD_COMPONENTS = ['theta_reward', 'theta_dot_reward', 'omega_reward', 'omega_dot_reward', 'power_reward',
+                     'psf_reward']
+
+# Weights of the reward components in the step reward of each reward version.
+# survival is a constant added every step, crash replaces the step reward with crash_reward when crashed.
+REWARD_VERSIONS = {
+    # without omega_dot and crash reward
+    'V-0': {'theta_reward': 1, 'theta_dot_reward': 1, 'omega_reward': 1, 'power_reward': 1, 'psf_reward': 1,
+            'survival': 1},
+    # with crash reward, without omega_dot
+    'V-1': {'theta_reward': 1, 'theta_dot_reward': 1, 'omega_reward': 1, 'power_reward': 1, 'psf_reward': 1,
+            'survival': 1, 'crash': True},
+    # without omega_dot, crash reward and theta
+    'V-2': {'theta_dot_reward': 1, 'omega_reward': 1, 'power_reward': 1, 'psf_reward': 1, 'survival': 1},
+    # power only
+    'V-3': {'power_reward': 1},
+    # power and crash reward only
+    'V-4': {'power_reward': 1, 'crash': True},
+    # without theta and crash reward
+    'V-5': {'theta_dot_reward': 1, 'omega_reward': 1, 'omega_dot_reward': 1, 'power_reward': 1, 'psf_reward': 1,
+            'survival': 1},
+    # without crash reward
+    'V-6': {'theta_reward': 1, 'theta_dot_reward': 1, 'omega_reward': 1, 'omega_dot_reward': 1, 'power_reward': 1,
+            'psf_reward': 1, 'survival': 1},
+    # without crash reward and survival
+    'V-7': {'theta_reward': 1, 'theta_dot_reward': 1, 'omega_reward': 1, 'omega_dot_reward': 1, 'power_reward': 1,
+            'psf_reward': 1},
+}
+
+
+class Reward:
+    def __init__(self, version, config):
+        """
+        Step reward of a reward version, a name in REWARD_VERSIONS or a dict of the same form.
+        The coefficients gamma_*, reward_survival and crash_reward are read from the env config.
+        The weights are resolved here once, and calling the Reward evaluates every component with math for
+        scalars or with numpy for arrays of many envs.
+        """
+        weights = REWARD_VERSIONS[version] if isinstance(version, str) else version
+        unknown = set(weights) - set(REWARD_COMPONENTS) - {'survival', 'crash'}
+        if unknown:
+            raise ValueError(f"Unknown reward terms {sorted(unknown)}")
+        self.weights = [(key, weights[key]) for key in REWARD_COMPONENTS if weights.get(key, 0)]
+        self.survival = weights.get('survival', 0) * config['reward_survival']
+        self.crash = weights.get('crash', False)
+        self.crash_reward = config['crash_reward']
+
+        self.gamma_theta = config['gamma_theta']
+        self.gamma_theta_dot = config['gamma_theta_dot']
+        self.gamma_omega = config['gamma_omega']
+        self.gamma_omega_dot = config['gamma_omega_dot']
+        self.gamma_power = config['gamma_power']
+        self.gamma_psf = config['gamma_psf']
+
+    def components(self, theta_deg, theta_dot_deg_s, omega_error_rpm, omega_dot_rpm_per_sec, power_error_MegaWatts,
+                   psf_deviation):
+        """
+        Every reward component, for scalars or arrays of the same shape.
+        psf_deviation is the sum of |agent action - psf action|.
+        """
+        exp = np.exp if isinstance(theta_deg, np.ndarray) else math.exp
+        abs_theta_deg = abs(theta_deg)
+        return {
+            'theta_reward': exp(-self.gamma_theta * abs_theta_deg) - self.gamma_theta * abs_theta_deg,
+            'theta_dot_reward': -self.gamma_theta_dot * theta_dot_deg_s * theta_dot_deg_s,
+            'omega_reward': exp(-self.gamma_omega * omega_error_rpm) - self.gamma_omega * omega_error_rpm,
+            'omega_dot_reward': -self.gamma_omega_dot * omega_dot_rpm_per_sec * omega_dot_rpm_per_sec,
+            'power_reward': exp(-self.gamma_power * power_error_MegaWatts) - self.gamma_power * power_error_MegaWatts,
+            'psf_reward': -self.gamma_psf * psf_deviation,
+        }
+
+    def __call__(self, components, crashed):
+        """
+        The step reward from the components, crashed is a bool or a bool array.
+        """
+        step_reward = self.survival
+        for key, weight in self.weights:
+            step_reward = step_reward + weight * components[key]
+        if self.crash:
+            if isinstance(crashed, np.ndarray):
+                return np.where(crashed, self.crash_reward, step_reward)
+            elif crashed:
+                return self.crash_reward
+        return step_reward
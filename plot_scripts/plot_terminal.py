@@ -1,10 +1,9 @@
-import multiprocessing
-
 from matplotlib import pyplot as plt
 import matplotlib.tri as mtri
 import numpy as np
 
-from gym_rl_mpc.objects.symbolic_model import change_random, get_sys, get_terminal_sys
+from gym_rl_mpc.objects.steady_state_map import steady_state_map
+from gym_rl_mpc.objects.symbolic_model import get_sys, get_terminal_sys
 from gym_rl_mpc.utils.model_params import DEG2RAD, RPM2RAD
 from PSF.utils import plotEllipsoid, get_terminal_set, max_ellipsoid
 
@@ -18,9 +17,11 @@ def plot_terminal():
     plotEllipsoid(P_fake, sys["Hx"], sys["hx"], x_0, savedir="plots", name="ellipsoid_fake_terminal")
 
 
-def plot_steady_state(pool, n=5000):
-    results = pool.starmap(change_random, [() for _ in range(n)])
-    z0s = np.hstack(results)
+def plot_steady_state(n_wind=50, n_setpoint=50):
+    winds = np.linspace(10 * 2 / 3, 25 * 2 / 3, n_wind)
+    power_map = steady_state_map(winds, np.linspace(0, 15e6, n_setpoint), mode="power")
+    pitch_map = steady_state_map(winds, np.linspace(-4 * DEG2RAD, 20 * DEG2RAD, n_setpoint), mode="blade_pitch")
+    z0s = np.vstack([power_map.reshape(-1, power_map.shape[-1]), pitch_map.reshape(-1, pitch_map.shape[-1])]).T
     z0s = z0s[:, ~np.isnan(z0s).any(axis=0)]
 
     W = z0s[-1, :] * 3 / 2
@@ -66,5 +67,4 @@ def plot_steady_state(pool, n=5000):
 
 if __name__ == "__main__":
     plot_terminal()
-    #with multiprocessing.Pool(7) as p:
-    #    plot_steady_state(p)
+    # plot_steady_state()
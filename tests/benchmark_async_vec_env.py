@@ -0,0 +1,60 @@
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.shared_memory_vec_env import SharedMemoryVecEnv
+from gym_rl_mpc.utils.async_ppo import AsyncPPO
+from stable_baselines3.common.env_util import make_vec_env
+
+ENV_ID = 'VariableWindLevel3-v17'
+N_STEPS = 100
+
+
+def async_steps_per_second(vec_env, batch_size, n_steps=N_STEPS):
+    """
+    Environment steps per second with random actions, sending each received batch of batch_size envs its next
+    action right away. batch_size = num_envs is the synchronous step of SubprocVecEnv.
+    """
+    rng = np.random.default_rng(0)
+    space = vec_env.action_space
+    vec_env.reset()
+    vec_env.send(rng.uniform(space.low, space.high, (vec_env.num_envs,) + space.shape))
+    start = perf_counter()
+    for _ in range(n_steps * vec_env.num_envs // batch_size):
+        _, _, _, _, env_ids = vec_env.recv(batch_size)
+        vec_env.send(rng.uniform(space.low, space.high, (len(env_ids),) + space.shape), env_ids)
+    n = n_steps * vec_env.num_envs // batch_size * batch_size
+    fps = n / (perf_counter() - start)
+    vec_env.recv()
+    return fps
+
+
+def training_fps(vec_env, batch_size, timesteps):
+    """
+    Timesteps per second of AsyncPPO.learn receiving batch_size envs at a time.
+    """
+    agent = AsyncPPO('MlpPolicy', vec_env, n_steps=128, env_batch_size=batch_size)
+    start = perf_counter()
+    agent.learn(total_timesteps=timesteps)
+    return timesteps / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['use_psf'] = True
+    print(f"{ENV_ID} with PSF on {os.cpu_count()} CPUs, steps/s")
+    print(f"{'N':>4} {'B':>4} {'send/recv':>10} {'AsyncPPO':>10}")
+    for n_envs in [4, 8, 16]:
+        vec_env = make_vec_env(ENV_ID, n_envs=n_envs, vec_env_cls=SharedMemoryVecEnv, env_kwargs={'env_config': config})
+        for batch_size in [n_envs, n_envs // 2, n_envs // 4]:
+            env_fps = async_steps_per_second(vec_env, batch_size)
+            ppo_fps = training_fps(vec_env, batch_size, timesteps=2 * 128 * n_envs)
+            print(f"{n_envs:>4} {batch_size:>4} {env_fps:10.0f} {ppo_fps:10.0f}")
+        vec_env.close()
@@ -0,0 +1,37 @@
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import gym
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+
+
+def startup_time(env_id, config, build_psf, number=5):
+    """
+    Mean seconds for gym.make and the first reset, building the PSF like before if build_psf.
+    """
+    start = perf_counter()
+    for _ in range(number):
+        env = gym.make(env_id, env_config=config).unwrapped
+        if build_psf:
+            env.psf
+        env.reset()
+    return (perf_counter() - start) / number
+
+
+if __name__ == '__main__':
+    scenarios = {env_id: scenario['config'] for env_id, scenario in gym_rl_mpc.SCENARIOS.items()
+                 if not scenario['config']['use_psf'] and env_id != 'RecordedWind-v17'}
+    # Imports and the stored terminal set are loaded once per process
+    startup_time(next(iter(scenarios)), next(iter(scenarios.values())), build_psf=True, number=1)
+
+    print(f"{'scenario':<32} {'eager PSF [ms]':>15} {'lazy PSF [ms]':>15}")
+    for env_id, config in scenarios.items():
+        eager = startup_time(env_id, config, build_psf=True)
+        lazy = startup_time(env_id, config, build_psf=False)
+        print(f"{env_id:<32} {eager * 1e3:15.1f} {lazy * 1e3:15.1f}")
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import CallbackList
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from train import ReportingCallback, TensorboardCallback
+
+ENV_ID = 'VariableWindLevel3-v17'
+N_ENVS = 8
+TIMESTEPS = 50000
+
+
+def training_fps(reporting):
+    """
+    Timesteps per second of PPO.learn on a SubprocVecEnv, with or without the reporting callbacks of train.py.
+    """
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['max_episode_time'] = 20  # Many episodes, so reporting is exercised
+    config['recording_level'] = 'summary'
+    env = make_vec_env(ENV_ID, n_envs=N_ENVS, vec_env_cls=SubprocVecEnv, env_kwargs={'env_config': config})
+    agent = PPO('MlpPolicy', env, n_steps=1024)
+    with tempfile.TemporaryDirectory() as report_dir:
+        callback = CallbackList([ReportingCallback(report_dir), TensorboardCallback()]) if reporting else None
+        start = perf_counter()
+        agent.learn(total_timesteps=TIMESTEPS, callback=callback)
+        fps = TIMESTEPS / (perf_counter() - start)
+    env.close()
+    return fps
+
+
+if __name__ == '__main__':
+    without = training_fps(reporting=False)
+    with_reporting = training_fps(reporting=True)
+    print(f"{ENV_ID}, {N_ENVS} SubprocVecEnv workers, {TIMESTEPS} timesteps")
+    print(f"--no_reporting: {without:8.0f} timesteps/s")
+    print(f"reporting:      {with_reporting:8.0f} timesteps/s ({with_reporting / without:.0%})")
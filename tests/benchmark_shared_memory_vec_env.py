@@ -0,0 +1,30 @@
+import os
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from benchmark_vec_env import steps_per_second
+from gym_rl_mpc.envs.shared_memory_vec_env import SharedMemoryVecEnv
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+ENV_ID = 'VariableWindLevel3-v17'
+
+if __name__ == '__main__':
+    # Without the PSF the env step is cheap, so the difference is the per-step communication with the workers
+    for use_psf in [False, True]:
+        config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+        config['use_psf'] = use_psf
+        n_steps = 50 if use_psf else 500
+        print(f"{ENV_ID} {'with' if use_psf else 'without'} PSF on {os.cpu_count()} CPUs, steps/s")
+        print(f"{'n_envs':>8} {'SubprocVecEnv':>14} {'SharedMemory':>14}")
+        for n_envs in [1, 2, 4, 8, 16]:
+            results = []
+            for vec_env_cls in [SubprocVecEnv, SharedMemoryVecEnv]:
+                vec_env = make_vec_env(ENV_ID, n_envs=n_envs, vec_env_cls=vec_env_cls, env_kwargs={'env_config': config})
+                results.append(steps_per_second(vec_env, n_steps))
+                vec_env.close()
+            print(f"{n_envs:>8} {results[0]:14.0f} {results[1]:14.0f}")
@@ -0,0 +1,55 @@
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc.objects.symbolic_model as sym
+import gym_rl_mpc.utils.model_params as params
+from gym_rl_mpc.objects.turbine import Turbine
+
+
+class SeparateCallsTurbine(Turbine):
+    """
+    Turbine evaluating the wind force, wind torque and state derivative with three separate Function calls,
+    as before the fused Function.
+    """
+
+    def state_dot_func(self, state, adjusted_wind_speed):
+        F_thr, u, power = self.input
+        omega = state[2]
+
+        self.F_w = sym.numerical_F_wind(omega, adjusted_wind_speed, u)
+        self.Q_w = sym.numerical_Q_wind(omega, adjusted_wind_speed, u)
+        self.Q_g = max(0, min(power / omega, params.max_generator_torque))
+
+        return sym.numerical_x_dot(state, u, F_thr, power, adjusted_wind_speed)
+
+
+def time_steps(turbine, number):
+    action = np.array([0.1, 0.2, 0.5])
+    return timeit.timeit(lambda: turbine.step(action, 15), number=number) / number
+
+
+if __name__ == '__main__':
+    number = 2000
+    wind = 15
+    step_size = 0.1
+
+    before = SeparateCallsTurbine(wind, step_size)
+    after = Turbine(wind, step_size)
+
+    for _ in range(10):
+        before.step(np.array([0.1, 0.2, 0.5]), wind)
+        after.step(np.array([0.1, 0.2, 0.5]), wind)
+    assert np.allclose(before.state, after.state, rtol=1e-12)
+    assert np.isclose(before.wind_force, after.wind_force) and np.isclose(before.wind_torque, after.wind_torque)
+
+    t_before = time_steps(before, number)
+    t_after = time_steps(after, number)
+    print(f"Turbine.step, separate Function calls: {t_before * 1e6:.1f} us/step")
+    print(f"Turbine.step, fused buffered Function: {t_after * 1e6:.1f} us/step ({t_before / t_after:.1f}x)")
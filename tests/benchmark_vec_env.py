@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.vec_turbine_env import VecTurbineEnv
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+ENV_ID = 'VariableWindLevel3-v17'
+
+
+def steps_per_second(vec_env, n_steps=200):
+    """
+    Environment steps per second (n_envs steps per vec_env.step) with random actions, auto-resets included.
+    """
+    rng = np.random.default_rng(0)
+    vec_env.reset()
+    actions = rng.uniform(vec_env.action_space.low, vec_env.action_space.high, (n_steps, vec_env.num_envs, 3))
+    start = perf_counter()
+    for action in actions:
+        vec_env.step(action)
+    return n_steps * vec_env.num_envs / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['use_psf'] = False
+    print(f"{ENV_ID} without PSF on {os.cpu_count()} CPUs, steps/s")
+    print(f"{'n_envs':>8} {'SubprocVecEnv':>14} {'VecTurbineEnv':>14}")
+    for n_envs in [1, 4, 16, 64, 256]:
+        vec_env = VecTurbineEnv(ENV_ID, n_envs, config, seed=0)
+        native = steps_per_second(vec_env)
+        vec_env.close()
+        if n_envs <= 16:
+            vec_env = make_vec_env(ENV_ID, n_envs=n_envs, vec_env_cls=SubprocVecEnv, env_kwargs={'env_config': config})
+            subproc = f"{steps_per_second(vec_env):14.0f}"
+            vec_env.close()
+        else:
+            subproc = f"{'-':>14}"
+        print(f"{n_envs:>8} {subproc} {native:14.0f}")
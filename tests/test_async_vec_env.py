@@ -0,0 +1,73 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.shared_memory_vec_env import SharedMemoryVecEnv
+from gym_rl_mpc.utils.async_ppo import AsyncPPO
+
+ENV_ID = 'VariableWindLevel3-v17'
+
+
+def make_envs(vec_env_cls, config, n_envs=4):
+    return make_vec_env(ENV_ID, n_envs=n_envs, seed=0, vec_env_cls=vec_env_cls, env_kwargs={'env_config': config})
+
+
+def test_partial_batches_match_sync_steps():
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['max_episode_time'] = 1
+    async_env = make_envs(SharedMemoryVecEnv, config)
+    dummy_env = make_envs(DummyVecEnv, config)
+    try:
+        async_env.reset()
+        dummy_env.reset()
+        rng = np.random.default_rng(0)
+        space = async_env.action_space
+        actions = rng.uniform(space.low, space.high, (20, 4, 3)).astype(np.float32)
+        n_steps = np.zeros(4, dtype=int)
+        async_env.send(actions[0])
+        n_in_flight = 4
+        with pytest.raises(ValueError):
+            async_env.send(actions[0, :1], [0])
+        while n_in_flight:
+            obs, reward, done, infos, env_ids = async_env.recv(min(2, n_in_flight))
+            assert len(env_ids) == len(infos) == obs.shape[0] == min(2, n_in_flight)
+            n_in_flight -= len(env_ids)
+            # Every env is stepped with its own actions in order
+            n_steps[env_ids] += 1
+            env_ids = env_ids[n_steps[env_ids] < 20]
+            if env_ids.size:
+                async_env.send(actions[n_steps[env_ids], env_ids], env_ids)
+                n_in_flight += len(env_ids)
+        assert (n_steps == 20).all()
+        final_obs = async_env.env_method('observe')
+
+        for step_actions in actions:
+            dummy_env.step(step_actions)
+        np.testing.assert_allclose(np.array(final_obs, dtype=np.float32), dummy_env.env_method('observe'),
+                                   rtol=1e-6)
+    finally:
+        async_env.close()
+        dummy_env.close()
+
+
+def test_async_ppo_rollout():
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['max_episode_time'] = 1
+    env = make_envs(SharedMemoryVecEnv, config)
+    try:
+        agent = AsyncPPO('MlpPolicy', env, n_steps=16, batch_size=32, n_epochs=1, env_batch_size=2)
+        agent.learn(total_timesteps=64)
+        assert agent.num_timesteps == 64
+        assert agent.rollout_buffer.full
+        assert not env._in_flight.any()
+    finally:
+        env.close()
@@ -0,0 +1,42 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from gym_rl_mpc.utils.crash_logger import CRASH_LABELS, CrashLogger, merge_crash_logs
+
+
+def test_crash_logs_merge(tmp_path):
+    rng = np.random.default_rng(0)
+    records = rng.normal(size=(10, len(CRASH_LABELS)))
+    loggers = [CrashLogger(tmp_path, flush_size=3), CrashLogger(tmp_path, flush_size=3)]
+    for i, record in enumerate(records):
+        loggers[i % 2].log(record)
+    for logger in loggers:
+        logger.close()
+
+    df = merge_crash_logs(tmp_path)
+    assert list(df.columns) == CRASH_LABELS
+    np.testing.assert_array_equal(df.values, np.vstack([records[0::2], records[1::2]]))
+    assert Path(tmp_path, "crash_data.csv").is_file()
+
+
+def test_merge_drops_partial_record(tmp_path):
+    logger = CrashLogger(tmp_path)
+    logger.log(np.arange(len(CRASH_LABELS)))
+    logger.close()
+    with open(logger.file_path, "ab") as f:
+        np.arange(3, dtype=np.float64).tofile(f)
+    df = merge_crash_logs(tmp_path, file_name=None)
+    np.testing.assert_array_equal(df.values, [np.arange(len(CRASH_LABELS))])
+
+
+def test_merge_orders_files_numerically(tmp_path):
+    for pid, n in [(10, 0), (2, 10), (2, 2), (9, 1)]:
+        np.full(len(CRASH_LABELS), pid * 100 + n, dtype=np.float64).tofile(Path(tmp_path, f"crash_data_{pid}_{n}.bin"))
+    df = merge_crash_logs(tmp_path, file_name=None)
+    np.testing.assert_array_equal(df['crash_cause'], [202, 210, 901, 1000])
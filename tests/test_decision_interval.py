@@ -0,0 +1,74 @@
+import os
+import sys
+from pathlib import Path
+
+import gym
+import numpy as np
+import pytest
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.vec_turbine_env import VecTurbineEnv
+from utils import simulate_episode
+
+ENV_ID = 'VariableWindLevel3-v17'
+
+
+def make_env(decision_interval):
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['decision_interval'] = decision_interval
+    env = gym.make(ENV_ID, env_config=config).unwrapped
+    env.seed(0)
+    env.reset()
+    return env
+
+
+def test_held_action_matches_repeated_steps():
+    k = 5
+    env_1, env_k = make_env(1), make_env(k)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        action = rng.uniform(env_1.action_space.low, env_1.action_space.high)
+        rewards = [env_1.step(action)[1] for _ in range(k)]
+        obs, reward, done, _ = env_k.step(action)
+        np.testing.assert_allclose(obs, env_1.observation, rtol=1e-12)
+        np.testing.assert_allclose(reward, sum(rewards), rtol=1e-12)
+        assert env_k.t_step == env_1.t_step
+        if done:
+            break
+
+
+def test_vec_env_decision_interval():
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['decision_interval'] = 10
+    config['max_episode_time'] = 5
+    vec_env = VecTurbineEnv(ENV_ID, 4, config, seed=0)
+    vec_env.reset()
+    for _ in range(6):
+        _, _, done, infos = vec_env.step(np.tile([0, 0, 0.5], (4, 1)))
+    for i in np.flatnonzero(done):
+        history = vec_env.get_attr('history', int(i))[0]
+        assert infos[i]['episode']['l'] <= 6
+        assert history['timesteps'] <= 51
+
+
+def test_simulate_episode_decision_interval():
+    k = 5
+    env = make_env(k)
+    df = simulate_episode(env, None, max_time=10)
+    # One row per decision, while t_step counts time-steps
+    assert len(df) == len(env.episode_history['time']) == int(np.ceil(env.t_step / k))
+    assert (np.diff(df['time']) > 0).all()
+
+
+def test_decision_longer_than_psf_horizon_is_rejected():
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['use_psf'] = True
+    config['decision_interval'] = int(config['psf_T'] / config['step_size'])
+    with pytest.raises(ValueError):
+        gym.make(ENV_ID, env_config=config)
+    config['decision_interval'] = 0
+    with pytest.raises(ValueError):
+        gym.make(ENV_ID, env_config=config)
@@ -0,0 +1,168 @@
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import gym
+import numpy as np
+import pytest
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+import gym_rl_mpc.objects.symbolic_model as sym
+from casadi import Function, SX, inf, log, sqrt, vertcat
+from gym_rl_mpc.objects.steady_state_map import initial_condition
+from gym_rl_mpc.objects.turbine import Turbine, TurbineBatch, odesolver45_adaptive
+from gym_rl_mpc.utils.codegen import function_to_python
+from PSF.polytope import sample_polytope
+from PSF.utils import Hh_from_disconnected_constraints
+
+
+def sample_points(n, seed=0):
+    Hz, hz = Hh_from_disconnected_constraints(np.vstack([sym.sys_lub_x, sym.sys_lub_u, 2 / 3 * sym.sys_lub_p]))
+    z = sample_polytope(Hz, hz, n, rng=seed)
+    return np.hsplit(z, [3, 6])
+
+
+def test_math_dynamics_matches_casadi():
+    X, U, W = sample_points(200)
+    for x, u, w in zip(X, U, W[:, 0]):
+        expected = [np.asarray(o).flatten() for o in sym._numerical_dynamics(x, u, w)]
+        actual = sym.math_dynamics(x.tolist(), u.tolist(), float(w))
+        for e, a in zip(expected, actual):
+            np.testing.assert_allclose(a, e, rtol=1e-12, atol=1e-15)
+
+
+def test_numpy_dynamics_matches_casadi_batch():
+    X, U, W = sample_points(200)
+    expected = [np.asarray(o) for o in sym._numerical_dynamics.map(X.shape[0])(X.T, U.T, W.T)]
+    actual = sym.numpy_dynamics(X.T, U.T, W[:, 0])
+    for e, a in zip(expected, actual):
+        np.testing.assert_allclose(np.array(a), e, rtol=1e-12, atol=1e-15)
+
+
+def test_generated_code_edge_inputs():
+    x = SX.sym('x', 2)
+    f = Function('f', [x], [vertcat(x[0] / x[1], sqrt(x[0]), log(x[1]), x[0] ** 0.5, x[1] ** x[0], x[0] + inf)])
+    for module in ("math", "numpy"):
+        generated = function_to_python(f, module)
+        for value in ([1.0, 2.0], [-1.0, 0.0], [2.0, 0.0], [-8.0, 2.0], [1e3, 1e300]):
+            expected = np.asarray(f(value)).flatten()
+            with np.errstate(all="ignore"):
+                outputs = generated(value if module == "math" else np.array(value))
+            # One tuple per output, whether or not the math code falls back to f
+            assert len(outputs) == 1
+            actual = np.array(outputs[0], dtype=float)
+            np.testing.assert_allclose(actual, expected, rtol=1e-15)
+
+
+def test_turbine_backends_equivalent():
+    rng = np.random.default_rng(0)
+    turbines = [Turbine(15, 0.1, backend="casadi"), Turbine(15, 0.1, backend="python")]
+    for _ in range(300):
+        action = rng.uniform([-1, -0.2, 0], [1, 1, 1])
+        wind = rng.uniform(10, 20)
+        for turbine in turbines:
+            turbine.step(action, wind)
+        casadi_turbine, numpy_turbine = turbines
+        np.testing.assert_allclose(numpy_turbine.state, casadi_turbine.state, rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose(numpy_turbine.state_dot, casadi_turbine.state_dot, rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose([numpy_turbine.wind_force, numpy_turbine.wind_torque],
+                                   [casadi_turbine.wind_force, casadi_turbine.wind_torque], rtol=1e-10)
+
+
+def test_turbine_batch_matches_turbine():
+    rng = np.random.default_rng(0)
+    winds = np.array([12., 15., 18.])
+    batch = TurbineBatch(winds, 0.1)
+    turbines = [Turbine(wind, 0.1, backend="python") for wind in winds]
+    for _ in range(100):
+        actions = rng.uniform([-1, -0.2, 0], [1, 1, 1], size=(len(winds), 3))
+        wind_speeds = winds + rng.normal(size=len(winds))
+        batch.step(actions, wind_speeds)
+        for i, turbine in enumerate(turbines):
+            turbine.step(actions[i], wind_speeds[i])
+    for i, turbine in enumerate(turbines):
+        view = batch[i]
+        np.testing.assert_allclose(view.state, turbine.state, rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose([view.omega_dot, view.wind_force, view.wind_torque, view.generator_torque],
+                                   [turbine.omega_dot, turbine.wind_force, turbine.wind_torque,
+                                    turbine.generator_torque], rtol=1e-12)
+
+
+def test_adaptive_integration():
+    tol = 1e-8
+    turbines = [Turbine(15, 1.0, backend=backend, integration_tol=tol) for backend in ("casadi", "python")]
+    reference = Turbine(15, 1.0, backend="python", integration_tol=1e-12)
+    action = np.array([0.1, 0.2, 0.5])
+    for _ in range(20):
+        for turbine in turbines + [reference]:
+            turbine.step(action, 15)
+        for turbine in turbines:
+            assert turbine.n_substeps >= 1
+            assert turbine.integration_error <= tol
+    np.testing.assert_allclose(turbines[1].state, turbines[0].state, rtol=1e-10)
+    np.testing.assert_allclose(turbines[1].state, reference.state, rtol=1e-6)
+
+
+def test_adaptive_integration_non_finite_error():
+    calls = []
+
+    def step(y, h):
+        # Non-finite above a sub-step length of 0.1, exact below
+        calls.append(h)
+        if h > 0.1:
+            return y + np.nan, y + np.nan
+        return y + h, y + h
+
+    y, _, n_substeps, error = odesolver45_adaptive(step, np.zeros(2), 1.0, 1e-6)
+    np.testing.assert_allclose(y, [1.0, 1.0])
+    assert np.isfinite(error)
+    assert calls[:3] == [1.0, 0.2, pytest.approx(0.04)]
+
+    with pytest.raises(FloatingPointError):
+        odesolver45_adaptive(lambda y, h: (y + np.nan, y), np.zeros(2), 1.0, 1e-6)
+
+
+def test_initial_condition_table_matches_nlp():
+    for wind in [2.0, 6.71, 10.03, 13.337, 16.6]:
+        x0, u0 = initial_condition(wind)
+        x0_nlp, u0_nlp = sym.solve_initial_problem(wind)
+        np.testing.assert_allclose(x0, x0_nlp, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(u0, u0_nlp, rtol=1e-5)
+
+
+def time_env_step(env_id, backend, number=2000):
+    config = gym_rl_mpc.SCENARIOS[env_id]['config'].copy()
+    config['use_psf'] = False
+    config['turbine_backend'] = backend
+    env = gym.make(env_id, env_config=config)
+    env.seed(0)
+    env.reset()
+    action = np.array([0.1, 0.2, 0.5])
+
+    def step():
+        if env.step(action)[2]:
+            env.reset()
+
+    return timeit.timeit(step, number=number) / number
+
+
+if __name__ == '__main__':
+    test_math_dynamics_matches_casadi()
+    test_numpy_dynamics_matches_casadi_batch()
+    test_generated_code_edge_inputs()
+    test_turbine_backends_equivalent()
+    test_turbine_batch_matches_turbine()
+    test_adaptive_integration()
+    test_adaptive_integration_non_finite_error()
+    test_initial_condition_table_matches_nlp()
+    print("python backend matches casadi backend")
+
+    env_id = 'VariableWindLevel3-v17'
+    t_casadi = time_env_step(env_id, "casadi")
+    t_python = time_env_step(env_id, "python")
+    print(f"{env_id} env.step without PSF, casadi backend: {t_casadi * 1e6:.1f} us/step")
+    print(f"{env_id} env.step without PSF, python backend: {t_python * 1e6:.1f} us/step ({t_casadi / t_python:.1f}x)")
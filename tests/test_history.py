@@ -0,0 +1,82 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+from pandas import read_csv
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from gym_rl_mpc import reporting
+from gym_rl_mpc.utils.history import HISTORY_KEYS, EpisodeHistory, iter_spilled_histories
+
+
+def make_history(episode, env_idx):
+    history = {key: float(episode * 10 + env_idx) for key in HISTORY_KEYS}
+    history['episode_num'] = episode
+    history['crashed'] = episode % 2
+    return history
+
+
+def test_history_is_bounded(tmp_path):
+    history = EpisodeHistory(maxlen=3, spill_dir=tmp_path, spill_size=2)
+    for episode in range(10):
+        history.append(make_history(episode, 0))
+    assert len(history) == 3
+    assert [h['episode_num'] for h in history] == [7, 8, 9]
+    assert history[-1]['episode_num'] == 9
+    assert history.n_spilled == 6
+
+    history.spill()
+    assert len(history) == 0
+    assert [h['episode_num'] for h in iter_spilled_histories(tmp_path)] == list(range(10))
+
+
+def test_history_without_spill_dir_drops():
+    history = EpisodeHistory(maxlen=2)
+    for episode in range(5):
+        history.append(make_history(episode, 0))
+    history.spill()
+    assert [h['episode_num'] for h in history] == [3, 4]
+    assert history.n_dropped == 3
+
+
+def test_spilled_histories_are_interleaved(tmp_path):
+    histories = [EpisodeHistory(maxlen=2, spill_dir=tmp_path, spill_size=3) for _ in range(3)]
+    for env_idx, history in enumerate(histories):
+        for episode in range(env_idx, 8):
+            history.append(make_history(episode, env_idx))
+    for history in histories:
+        history.spill()
+
+    spilled = list(iter_spilled_histories(tmp_path, chunk_size=2))
+    assert [h['episode_num'] for h in spilled] == sorted(h['episode_num'] for h in spilled)
+    assert len(spilled) == 8 + 7 + 6
+    assert spilled[0] == make_history(0, 0)
+
+
+def test_report_total_history(tmp_path):
+    histories = [make_history(episode, 0) for episode in range(25)]
+    assert reporting.report_total_history(iter(histories), tmp_path, lastn=10, chunk_size=7) == 25
+
+    df = read_csv(Path(tmp_path, "total_history_data.csv"), index_col=0)
+    assert list(df.index) == list(range(25))
+    np.testing.assert_array_equal(df['episode'], np.arange(25))
+    summary = Path(tmp_path, "summary.txt").read_text()
+    assert '# TOTAL EPISODES TRAINED: 25' in summary
+    assert 'LAST 10 EPISODES' in summary
+
+
+def test_spilled_histories_file_order(tmp_path):
+    # Files of the same episodes are taken in numeric (pid, n) order
+    for pid, n in [(2, 10), (10, 0), (2, 2), (9, 1)]:
+        history = EpisodeHistory(maxlen=0, spill_dir=tmp_path)
+        history.file_path = Path(tmp_path, f"history_{pid}_{n}.bin")
+        for episode in range(3):
+            history.append(make_history(episode, pid * 100 + n))
+        history.spill()
+
+    spilled = list(iter_spilled_histories(tmp_path, chunk_size=1))
+    assert [h['episode_num'] for h in spilled] == [0] * 4 + [1] * 4 + [2] * 4
+    assert [h['avg_abs_theta'] - h['episode_num'] * 10 for h in spilled] == [202, 210, 901, 1000] * 3
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).parent
+
+# Cumulative import time of gym_rl_mpc.envs without gym itself, in seconds. Measured at ~0.05 s
+IMPORT_TIME_BUDGET = 0.25
+# Only needed by the PSF terminal set, the crash log and reporting
+DEFERRED_MODULES = ["cvxpy", "pandas", "scipy"]
+
+
+def import_times(module):
+    """
+    Cumulative import time in seconds of every module imported by `import module`, from python -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE.parent, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) * 1e-6
+    return times
+
+
+def test_import_time():
+    times = import_times("gym_rl_mpc.envs")
+    for module in DEFERRED_MODULES:
+        assert module not in times, f"{module} is imported by gym_rl_mpc.envs"
+    own_time = times["gym_rl_mpc.envs"] - times["gym"]
+    assert own_time < IMPORT_TIME_BUDGET, f"gym_rl_mpc.envs imports in {own_time:.3f} s"
+
+
+if __name__ == '__main__':
+    times = import_times("gym_rl_mpc.envs")
+    print(f"gym_rl_mpc.envs: {times['gym_rl_mpc.envs']:.3f} s, "
+          f"of which gym {times['gym']:.3f} s")
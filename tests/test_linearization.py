@@ -0,0 +1,58 @@
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+from casadi import Function, jacobian
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc.objects.symbolic_model as sym
+from PSF.linearization import quantize
+from PSF.polytope import sample_polytope
+from PSF.utils import Hh_from_disconnected_constraints
+
+
+def sample_points(n, seed=0):
+    Hz, hz = Hh_from_disconnected_constraints(np.vstack([sym.sys_lub_x, sym.sys_lub_u, 2 / 3 * sym.sys_lub_p]))
+    z = sample_polytope(Hz, hz, n, rng=seed)
+    return np.hsplit(z, [3, 6])
+
+
+def test_linearization_matches_jacobian():
+    jacobians = Function("jacobians", [sym.x, sym.u, sym.w],
+                   [jacobian(sym.symbolic_x_dot, sym.x), jacobian(sym.symbolic_x_dot, sym.u), sym.symbolic_x_dot])
+    linearization = sym.get_linearization()
+    for x, u, w in zip(*sample_points(50)):
+        x, u, w = [quantize(z) for z in (x, u, w)]
+        A, B, g = linearization(x, u, w)
+        A_exp, B_exp, x_dot = [np.asarray(o) for o in jacobians(x, u, w)]
+        np.testing.assert_allclose(A, A_exp)
+        np.testing.assert_allclose(B, B_exp)
+        np.testing.assert_allclose(A @ x[:, None] + B @ u[:, None] + g, x_dot, rtol=1e-9, atol=1e-12)
+
+
+def test_linearization_batch_and_cache():
+    linearization = sym.get_linearization()
+    linearization.cache_clear()
+    X, U, W = sample_points(20)
+    A, B, g = linearization.batch(X, U, W)
+    for i in range(X.shape[0]):
+        A_i, B_i, g_i = linearization(X[i], U[i], W[i])
+        np.testing.assert_allclose(A[i], A_i, rtol=1e-4, atol=1e-4 * np.abs(A_i).max())
+        np.testing.assert_allclose(B[i], B_i, rtol=1e-4, atol=1e-4 * np.abs(B_i).max())
+    # Points within the quantization share one cached evaluation
+    linearization(X[0] * (1 + 1e-9), U[0], W[0])
+    assert linearization.cache_info().hits == 1
+
+
+if __name__ == '__main__':
+    test_linearization_matches_jacobian()
+    test_linearization_batch_and_cache()
+    linearization = sym.get_linearization()
+    X, U, W = sample_points(1000)
+    n = 1000
+    print(f"Single point, cached: {timeit.timeit(lambda: linearization(X[0], U[0], W[0]), number=n) / n * 1e6:.1f} us")
+    print(f"Batch of {X.shape[0]}: {timeit.timeit(lambda: linearization.batch(X, U, W), number=10) / 10 * 1e3:.2f} ms")
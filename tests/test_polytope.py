@@ -0,0 +1,76 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from PSF.polytope import bounding_box, chebyshev_center, minimal_representation, sample_polytope
+
+# Triangle with the vertices (0, 0), (0, 1) and (500, 0.5), badly scaled between the axes
+HZ = np.array([
+    [0., -1.],
+    [-1., 0.],
+    [1., -1000.],
+    [1e-3, 1.],
+])
+HZ_B = np.array([[0.], [0.], [0.], [1.]])
+
+
+def test_bounding_box_and_center():
+    np.testing.assert_allclose(bounding_box(HZ, HZ_B), [[0, 500], [0, 1]], atol=1e-6)
+    center = chebyshev_center(HZ, HZ_B)
+    assert (HZ @ center <= HZ_B.flatten() + 1e-9).all()
+    assert center[1] > 0
+
+
+@pytest.mark.parametrize("method", ["box", "hit_and_run"])
+def test_samples_inside_polytope(method):
+    z = sample_polytope(HZ, HZ_B, n=500, rng=0, method=method)
+    assert z.shape == (500, 2)
+    assert (z @ HZ.T <= HZ_B.T + 1e-9).all()
+    # Uniform in the triangle, the mean is the centroid
+    np.testing.assert_allclose(z.mean(axis=0), [500 / 3, 0.5], rtol=0.15)
+
+
+@pytest.mark.parametrize("method", ["box", "hit_and_run"])
+def test_samples_reproducible(method):
+    z = sample_polytope(HZ, HZ_B, n=50, rng=1, method=method)
+    np.testing.assert_array_equal(z, sample_polytope(HZ, HZ_B, n=50, rng=np.random.default_rng(1), method=method))
+    assert not np.array_equal(z, sample_polytope(HZ, HZ_B, n=50, rng=2, method=method))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        sample_polytope(HZ, HZ_B, method="grid")
+
+
+def test_minimal_representation():
+    H = np.vstack([
+        HZ,
+        HZ[2],  # duplicate
+        3 * HZ[3],  # scaled
+        [1., 1.],  # redundant, z_0 + z_1 <= 501 is implied
+        [0., 0.],  # trivial
+    ])
+    h = np.vstack([HZ_B, HZ_B[2], 3 * HZ_B[3], [[501.]], [[1.]]])
+    H_min, h_min = minimal_representation(H, h)
+
+    # z_1 >= 0 of HZ[0] follows from z_0 >= 0 and z_0 <= 1000 z_1, the three sides of the triangle remain
+    assert h_min.shape == (3, 1)
+    np.testing.assert_allclose(np.linalg.norm(H_min, axis=1), 1)
+    expected = HZ[1:] / np.linalg.norm(HZ[1:], axis=1, keepdims=True)
+    assert sorted(map(tuple, np.round(H_min, 9))) == sorted(map(tuple, np.round(expected, 9)))
+
+    # The set is unchanged
+    z = np.random.default_rng(0).uniform([-10, -0.5], [600, 1.5], size=(2000, 2))
+    np.testing.assert_array_equal((z @ H.T <= h.T).all(axis=1), (z @ H_min.T <= h_min.T + 1e-12).all(axis=1))
+    np.testing.assert_allclose(bounding_box(H_min, h_min), bounding_box(HZ, HZ_B), atol=1e-6)
+
+
+def test_minimal_representation_empty():
+    with pytest.raises(ValueError):
+        minimal_representation(np.vstack([HZ, [0., 0.]]), np.vstack([HZ_B, [[-1.]]]))
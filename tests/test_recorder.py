@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import gym
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+
+
+def run_episode(recording_level, n_steps=200):
+    config = gym_rl_mpc.SCENARIOS['VariableWindLevel3-v17']['config'].copy()
+    config['recording_level'] = recording_level
+    env = gym.make('VariableWindLevel3-v17', env_config=config).unwrapped
+    env.seed(0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(n_steps):
+        _, _, done, _ = env.step(rng.uniform(env.action_space.low, env.action_space.high))
+        if done:
+            break
+    env.reset()
+    return env
+
+
+def test_summary_matches_full():
+    full = run_episode("full")
+    summary = run_episode("summary")
+    assert full.history.keys() == summary.history.keys()
+    for key, value in full.history.items():
+        np.testing.assert_allclose(summary.history[key], value, rtol=1e-9, atol=1e-12)
+    assert summary.episode_history == {}
+    assert run_episode("none").history == {}
+
+
+def test_full_trajectory():
+    config = gym_rl_mpc.SCENARIOS['ConstantWind-v17']['config'].copy()
+    config['max_episode_time'] = 1
+    env = gym.make('ConstantWind-v17', env_config=config).unwrapped
+    env.reset()
+    rng = np.random.default_rng(0)
+    actions = []
+    done = False
+    while not done:
+        actions.append(rng.uniform(env.action_space.low, env.action_space.high))
+        _, _, done, _ = env.step(actions[-1])
+    history = env.episode_history
+    assert history['states'].shape == (env.t_step, 3)
+    np.testing.assert_array_equal(history['agent_actions'], actions)
+    np.testing.assert_allclose(history['states'][:, 0].std(), env.recorder.summary()['std_theta'], atol=1e-12)
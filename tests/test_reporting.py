@@ -0,0 +1,33 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from gym_rl_mpc import reporting
+
+
+def make_history(i):
+    history = {key: float(i) for key in reporting.REPORT_COLUMNS.values() if key is not None}
+    history['crashed'] = i % 2
+    return history
+
+
+def test_report_writer_round_trip(tmp_path):
+    histories = [make_history(i) for i in range(25)]
+    writer = reporting.ReportWriter(tmp_path, flush_size=10)
+    for history in histories:
+        writer.add(history)
+    writer.close()
+
+    df = reporting.read_report(tmp_path)
+
+    class Struct(object): pass
+    env = Struct()
+    env.history = histories
+    expected = reporting.format_history(env)
+    assert list(df.columns) == list(expected.columns)
+    np.testing.assert_allclose(df.values, expected.values.astype(float))
@@ -0,0 +1,43 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.utils.reward import REWARD_COMPONENTS, REWARD_VERSIONS, Reward
+
+
+def sample_quantities(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(-10, 10, n), rng.uniform(-5, 5, n), rng.uniform(0, 3, n), rng.uniform(-2, 2, n),
+            rng.uniform(0, 15, n), rng.uniform(0, 1, n))
+
+
+def test_scalar_and_batch_agree():
+    config = gym_rl_mpc.DEFAULT_CONFIG
+    quantities = sample_quantities(100)
+    crashed = np.arange(100) % 7 == 0
+    for version in REWARD_VERSIONS:
+        reward = Reward(version, config)
+        batch_components = reward.components(*quantities)
+        batch_reward = reward(batch_components, crashed) + np.zeros(100)
+        for i in range(100):
+            components = reward.components(*(float(q[i]) for q in quantities))
+            for key in REWARD_COMPONENTS:
+                np.testing.assert_allclose(components[key], batch_components[key][i], rtol=1e-12)
+            np.testing.assert_allclose(reward(components, bool(crashed[i])), batch_reward[i], rtol=1e-12)
+
+
+def test_weighted_terms():
+    config = gym_rl_mpc.DEFAULT_CONFIG
+    quantities = sample_quantities(10)
+    components = Reward('V-7', config).components(*quantities)
+    custom = Reward({'power_reward': 2, 'omega_reward': 0.5, 'survival': 1, 'crash': True}, config)
+    expected = 2 * components['power_reward'] + 0.5 * components['omega_reward'] + config['reward_survival']
+    np.testing.assert_allclose(custom(components, np.zeros(10, dtype=bool)), expected)
+    np.testing.assert_allclose(custom(components, np.ones(10, dtype=bool)), config['crash_reward'])
+    np.testing.assert_allclose(Reward('V-7', config)(components, False), sum(components.values()))
@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.shared_memory_vec_env import SharedMemoryVecEnv
+
+ENV_ID = 'VariableWindLevel3-v17'
+
+
+def make_envs(vec_env_cls, config, n_envs=3):
+    return make_vec_env(ENV_ID, n_envs=n_envs, seed=0, vec_env_cls=vec_env_cls, env_kwargs={'env_config': config})
+
+
+def test_shared_memory_vec_env_matches_dummy_vec_env():
+    config = gym_rl_mpc.SCENARIOS[ENV_ID]['config'].copy()
+    config['max_episode_time'] = 1
+    shared_env = make_envs(SharedMemoryVecEnv, config)
+    dummy_env = make_envs(DummyVecEnv, config)
+    try:
+        np.testing.assert_allclose(shared_env.reset(), dummy_env.reset(), rtol=1e-6)
+        rng = np.random.default_rng(0)
+        n_done = 0
+        for _ in range(25):
+            actions = rng.uniform(shared_env.action_space.low, shared_env.action_space.high, (3, 3))
+            obs, reward, done, infos = shared_env.step(actions)
+            dummy_obs, dummy_reward, dummy_done, dummy_infos = dummy_env.step(actions)
+            np.testing.assert_allclose(obs, dummy_obs, rtol=1e-6)
+            np.testing.assert_allclose(reward, dummy_reward, rtol=1e-6)
+            np.testing.assert_array_equal(done, dummy_done)
+            for info, dummy_info in zip(infos, dummy_infos):
+                assert info.keys() == dummy_info.keys()
+                if 'episode_history' in info:
+                    assert info['episode_history']['timesteps'] == dummy_info['episode_history']['timesteps']
+            n_done += done.sum()
+        assert n_done > 0
+
+        assert shared_env.get_attr('episode') == dummy_env.get_attr('episode')
+        shared_env.set_attr('gamma_psf', 1, indices=1)
+        assert shared_env.get_attr('gamma_psf') == [config['gamma_psf'], 1, config['gamma_psf']]
+        assert shared_env.env_method('observe', indices=[0])[0].shape == shared_env.observation_space.shape
+        assert shared_env.env_is_wrapped(Monitor) == [True] * 3
+    finally:
+        shared_env.close()
+        dummy_env.close()
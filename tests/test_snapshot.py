@@ -0,0 +1,41 @@
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import gym
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+
+
+def rollout(env, actions):
+    return [env.step(action)[:2] for action in actions]
+
+
+def test_branch_from_snapshot():
+    env_id = 'VariableWindLevel6-v17'
+    env = gym.make(env_id, env_config=gym_rl_mpc.SCENARIOS[env_id]['config']).unwrapped
+    env.seed(0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    rollout(env, rng.uniform(env.action_space.low, env.action_space.high, (50, 3)))
+
+    state = pickle.loads(pickle.dumps(env.get_state()))
+    actions = rng.uniform(env.action_space.low, env.action_space.high, (50, 3))
+    first = rollout(env, actions)
+    summary = env.recorder.summary()
+
+    # A different branch, then back to the snapshot
+    rollout(env, rng.uniform(env.action_space.low, env.action_space.high, (20, 3)))
+    env.set_state(state)
+    assert env.t_step == 50
+    second = rollout(env, actions)
+
+    for (obs_1, reward_1), (obs_2, reward_2) in zip(first, second):
+        np.testing.assert_array_equal(obs_1, obs_2)
+        assert reward_1 == reward_2
+    assert env.recorder.summary() == summary
@@ -0,0 +1,112 @@
+import os
+import sys
+from pathlib import Path
+
+import gym
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+import gym_rl_mpc.objects.symbolic_model as sym
+import gym_rl_mpc.objects.steady_state_map as ssm
+from gym_rl_mpc.utils.model_params import DEG2RAD, RPM2RAD
+
+NX = sym.x.shape[0]
+
+
+def max_x_dot(z):
+    x_dot, _, _ = sym.get_python_dynamics("math")(z[:NX].tolist(), z[NX:-1].tolist(), float(z[-1]))
+    return max(abs(e) for e in x_dot)
+
+
+def assert_steady_states(z, tol=1e-5):
+    """
+    Every solved row [x, u, w] of z is a steady state inside the model constraints.
+    """
+    z = z.reshape(-1, z.shape[-1])
+    solved = z[~np.isnan(z).any(axis=1)]
+    assert solved.shape[0] > 0
+    lub = np.vstack([sym.sys_lub_x, sym.sys_lub_u])
+    assert (solved[:, :-1] >= lub[:, 0] - 1e-6).all() and (solved[:, :-1] <= lub[:, 1] + 1e-6).all()
+    for row in solved:
+        assert max_x_dot(row) <= tol
+
+
+def test_steady_state_map_small_grid(tmp_path):
+    winds = np.linspace(8, 14, 3)
+    powers = np.linspace(2e6, 10e6, 3)
+    z = ssm.steady_state_map(winds, powers, mode="power", path=tmp_path)
+    assert z.shape == (3, 3, NX + sym.u.shape[0] + 1)
+    assert_steady_states(z)
+    solved = ~np.isnan(z[..., 0])
+    np.testing.assert_array_equal(z[..., NX + 2][solved], np.broadcast_to(powers, z.shape[:2])[solved])
+    np.testing.assert_array_equal(z[..., -1][solved], np.broadcast_to(winds[:, None], z.shape[:2])[solved])
+
+    # Stored and loaded again
+    assert len(list(tmp_path.iterdir())) == 1
+    np.testing.assert_array_equal(ssm.steady_state_map(winds, powers, mode="power", path=tmp_path), z)
+
+    pitches = np.linspace(0, 10 * DEG2RAD, 3)
+    z = ssm.steady_state_map(winds, pitches, mode="blade_pitch", path=tmp_path)
+    assert_steady_states(z)
+    solved = ~np.isnan(z[..., 0])
+    np.testing.assert_array_equal(z[..., NX + 1][solved], np.broadcast_to(pitches, z.shape[:2])[solved])
+
+
+def test_change_random_blade_pitch_branch():
+    n_pitch = 0
+    for seed in range(20):
+        # Draws of change_random before the steady state problem
+        rng = np.random.default_rng(seed)
+        wind = rng.uniform(10 * 2 / 3, 25 * 2 / 3)
+        if rng.random() < 0.5:
+            continue
+        pitch = rng.uniform(-4 * DEG2RAD, 20 * DEG2RAD)
+
+        z = sym.change_random(seed).flatten()
+        if np.isnan(z).any():
+            continue
+        n_pitch += 1
+        # [x, F_thr, u_p, P_ref, wind] is a steady state for the drawn pitch, it used to be solved as a power
+        assert z[NX + 1] == pitch
+        assert z[-1] == wind
+        assert max_x_dot(z) <= 1e-5
+    assert n_pitch > 0
+
+
+def test_map_path_is_independent_of_cwd():
+    assert ssm.MAP_PATH.is_absolute()
+    assert ssm.MAP_PATH == Path(ssm.__file__).parent / "stored_steady_state"
+
+
+def test_load_or_solve_replaces_corrupt_file(tmp_path):
+    z = np.arange(6.0).reshape(2, 3)
+    calls = []
+
+    def solve_map():
+        calls.append(1)
+        return z
+
+    np.testing.assert_array_equal(ssm._load_or_solve("key", solve_map, tmp_path), z)
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1, "No temporary file may be left next to the map"
+
+    # A truncated file, as left by an interrupted write, is solved again and overwritten
+    files[0].write_bytes(files[0].read_bytes()[:20])
+    np.testing.assert_array_equal(ssm._load_or_solve("key", solve_map, tmp_path), z)
+    np.testing.assert_array_equal(ssm._load_or_solve("key", solve_map, tmp_path), z)
+    assert len(calls) == 2
+    assert list(tmp_path.iterdir()) == files
+
+
+def test_psf_omega_bounds_do_not_change_model_constraints():
+    sys_lub_x = sym.sys_lub_x.copy()
+    config = gym_rl_mpc.SCENARIOS['VariableWindLevel0-v17']['config'].copy()
+    config['psf_lb_omega'] = 5.5 * RPM2RAD
+    config['psf_ub_omega'] = 7 * RPM2RAD
+    env = gym.make('VariableWindLevel0-v17', env_config=config).unwrapped
+
+    np.testing.assert_array_equal(sym.sys_lub_x, sys_lub_x)
+    np.testing.assert_array_equal(env._psf_sys_lub_x[2], [5.5 * RPM2RAD, 7 * RPM2RAD])
@@ -0,0 +1,105 @@
+import os
+import sys
+from pathlib import Path
+
+import gym
+import numpy as np
+import pytest
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+import gym_rl_mpc
+from gym_rl_mpc.envs.vec_turbine_env import VecTurbineEnv
+from gym_rl_mpc.objects.turbine import Turbine
+import gym_rl_mpc.utils.model_params as params
+
+
+def test_vec_env_matches_single_env():
+    env_id = 'ConstantWind-v17'
+    config = gym_rl_mpc.SCENARIOS[env_id]['config'].copy()
+    vec_env = VecTurbineEnv(env_id, 3, config, seed=0)
+    vec_obs = vec_env.reset()
+
+    env = gym.make(env_id, env_config=config).unwrapped
+    env.reset()
+    env.wind_speed = vec_env.wind_speed[1]
+    env.turbine = Turbine(env.wind_speed, env.step_size, backend="python")
+    np.testing.assert_allclose(vec_obs[1], env.observe(), rtol=1e-6)
+
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        actions = rng.uniform(env.action_space.low, env.action_space.high, (3, 3))
+        vec_obs, vec_reward, vec_done, _ = vec_env.step(actions)
+        obs, reward, done, _ = env.step(actions[1])
+        np.testing.assert_allclose(vec_obs[1], obs, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(vec_reward[1], reward, rtol=1e-9)
+        assert vec_done[1] == done
+        if done:
+            break
+
+
+def test_vec_env_auto_reset():
+    env_id = 'VariableWindLevel3-v17'
+    config = gym_rl_mpc.SCENARIOS[env_id]['config'].copy()
+    config['max_episode_time'] = 1
+    vec_env = VecTurbineEnv(env_id, 4, config, seed=0)
+    vec_env.reset()
+    rng = np.random.default_rng(0)
+    finished = np.zeros(4, dtype=bool)
+    for _ in range(int(config['max_episode_time'] / config['step_size']) + 1):
+        actions = rng.uniform(vec_env.action_space.low, vec_env.action_space.high, (4, 3))
+        obs, _, done, infos = vec_env.step(actions)
+        histories = vec_env.get_attr('history')
+        for i in np.flatnonzero(done):
+            assert infos[i]['terminal_observation'].shape == obs[i].shape
+            assert infos[i]['episode']['l'] == histories[i]['timesteps']
+            assert vec_env.get_attr('t_step', i) == [0]
+        finished |= done
+    assert finished.all()
+    assert all(episode >= 2 for episode in vec_env.get_attr('episode'))
+
+
+def test_recorded_wind(tmp_path):
+    path = tmp_path / "wind_speed.npy"
+    np.save(path, 15 + np.sin(np.arange(36000) / 60))
+    config = gym_rl_mpc.SCENARIOS['RecordedWind-v17']['config'].copy()
+    config['wind_file'] = str(path)
+    env = gym.make('RecordedWind-v17', env_config=config).unwrapped
+    env.reset()
+    assert env.wind_series.shape == (int(config['max_episode_time'] / config['step_size']) + 1,)
+    env.step(env.action_space.sample())
+    assert env.wind_speed == env.wind_series[0]
+
+    vec_env = VecTurbineEnv('RecordedWind-v17', 4, config, seed=0)
+    vec_env.reset()
+    assert ((vec_env.wind_speed >= 14) & (vec_env.wind_speed <= 16)).all()
+
+
+def test_vec_env_env_method(tmp_path):
+    config = gym_rl_mpc.SCENARIOS['ConstantWind-v17']['config'].copy()
+    config['history_length'] = 1
+    config['history_spill_dir'] = str(tmp_path)
+    vec_env = VecTurbineEnv('ConstantWind-v17', 3, config, seed=0)
+    obs = vec_env.reset()
+    observed = vec_env.env_method('observe', indices=[0, 2])
+    np.testing.assert_array_equal(observed, obs[[0, 2]])
+    assert vec_env.env_method('spill_history') == [None] * 3
+    with pytest.raises(AttributeError):
+        vec_env.env_method('not_a_method')
+
+
+def test_vec_env_rejects_other_models():
+    for key, value in [('turbine_backend', 'casadi'), ('integration_tol', 1e-6)]:
+        config = gym_rl_mpc.SCENARIOS['ConstantWind-v17']['config'].copy()
+        config[key] = value
+        with pytest.raises(ValueError):
+            VecTurbineEnv('ConstantWind-v17', 2, config)
+
+
+def test_setpoints_are_array_safe():
+    wind_speeds = np.linspace(0, 25, 101)
+    np.testing.assert_array_equal(params.power_regime(wind_speeds), [params.power_regime(w) for w in wind_speeds])
+    np.testing.assert_array_equal(params.omega_setpoint(wind_speeds), [params.omega_setpoint(w) for w in wind_speeds])
+    assert isinstance(params.power_regime(5.0), float)
+    assert isinstance(params.omega_setpoint(5.0), float)
@@ -0,0 +1,52 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+from casadi import SX
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from PSF.verification import sample_ellipsoid, verify_terminal_set
+
+
+def stable_linear_sys():
+    """
+    xdot = -(1 + p) x + [1, 0]^T u with p in [0, 1] and the box |x_i| <= 1, |u| <= 1.
+    """
+    x = SX.sym('x', 2)
+    u = SX.sym('u', 1)
+    p = SX.sym('p', 1)
+    return {
+        "x": x, "u": u, "p": p,
+        "xdot": -(1 + p) * x + np.array([[1], [0]]) @ u,
+        "Hx": np.vstack([np.eye(2), -np.eye(2)]), "hx": np.ones((4, 1)),
+        "Hu": np.array([[1], [-1]]), "hu": np.ones((2, 1)),
+        "Hp": np.array([[1], [-1]]), "hp": np.array([[1], [0]]),
+    }
+
+
+def test_sample_ellipsoid():
+    P = np.diag([1, 4])
+    samples = sample_ellipsoid(P, np.zeros(2), alpha=2, n=1000, rng=0)
+    V = np.einsum('ni,ij,nj->n', samples, P, samples)
+    assert (V <= 2 + 1e-9).all()
+    np.testing.assert_allclose(V[:500], 2)
+
+
+def test_invariant_ellipsoid_passes():
+    # V = x^T x decreases along every trajectory with u = 0, and the unit disc is inside the box
+    result = verify_terminal_set(stable_linear_sys(), np.eye(2), np.zeros((1, 2)), np.zeros(2), np.zeros(1),
+                                 n_samples=500, T=1, rng=0)
+    assert result['violation_fraction'] == 0
+    assert result['worst_margin'] > 0
+
+
+def test_scaled_up_ellipsoid_fails():
+    # The disc of radius 2 is still invariant, but leaves the box |x_i| <= 1
+    result = verify_terminal_set(stable_linear_sys(), np.eye(2) / 4, np.zeros((1, 2)), np.zeros(2), np.zeros(1),
+                                 n_samples=500, T=1, rng=0)
+    assert result['violation_fraction'] > 0
+    assert result['state_violation_fraction'] > 0
+    assert result['set_violation_fraction'] == 0
@@ -0,0 +1,59 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE.parent))  # to import gym and psf
+os.chdir(HERE.parent)
+from gym_rl_mpc.objects.wind import gust, load_wind_record, record_windows, turbulence, wind_series
+
+
+def test_sinusoidal_series_matches_formula():
+    rng = np.random.default_rng(0)
+    series = wind_series(3001, 0.1, rng, 15, amplitude=2, period=60, phase_shift=1)
+    t = np.arange(3001) * 0.1
+    np.testing.assert_allclose(series, 2 * np.sin(2 * np.pi * t / 60 + 1) + 15)
+
+
+def test_turbulence_intensity():
+    rng = np.random.default_rng(0)
+    mean = np.array([10, 15, 20])
+    for spectrum in ["kaimal", "von_karman"]:
+        u = turbulence(2 ** 16, 0.1, mean, 0.1, rng, spectrum)
+        assert u.shape == (3, 2 ** 16)
+        np.testing.assert_allclose(u.mean(axis=1), 0, atol=1e-9)
+        # The spectrum below the lowest frequency of the series is missing, so the std is somewhat lower
+        np.testing.assert_allclose(u.std(axis=1), 0.1 * mean, rtol=0.2)
+
+
+def test_batched_series_seeded_and_clipped():
+    kwargs = dict(mean=np.array([12, 18]), amplitude=np.array([1, 3]), phase_shift=np.array([0, 2]), noise_std=0.2,
+                  spectrum="kaimal", turbulence_intensity=0.15, gust_amplitude=5, min_wind_speed=10,
+                  max_wind_speed=20)
+    a = wind_series(3001, 0.1, np.random.default_rng(1), **kwargs)
+    b = wind_series(3001, 0.1, np.random.default_rng(1), **kwargs)
+    assert a.shape == (2, 3001)
+    np.testing.assert_array_equal(a, b)
+    assert a.min() >= 10 and a.max() <= 20
+
+
+def test_gust_shape():
+    g = gust(1000, 0.1, np.array([4, 8]), np.array([10, 50]))
+    assert (g[0, :100] == 0).all() and (g[1, :500] == 0).all()
+    np.testing.assert_allclose(g[1].min(), 2 * g[0].min())
+
+
+def test_record_windows_interpolate(tmp_path):
+    path = tmp_path / "wind_speed.npy"
+    np.save(path, np.arange(1000, dtype=float))
+    record = load_wind_record(path)
+    assert isinstance(record, np.memmap)
+    assert load_wind_record(path) is record
+
+    windows = record_windows(record, 1, 301, 0.1, np.random.default_rng(0), 50)
+    assert windows.shape == (50, 301)
+    # The record is its own time axis, so every window is a line with slope 1 m/s per second
+    np.testing.assert_allclose(windows - windows[:, :1], np.tile(np.arange(301) * 0.1, (50, 1)), atol=1e-9)
+    assert windows.min() >= 0 and windows.max() <= 999
@@ -6,13 +6,15 @@ import os
 from time import time
 
 import numpy as np
-from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import BaseCallback, CallbackList, CheckpointCallback
 from stable_baselines3.common.env_util import make_vec_env
-from stable_baselines3.common.vec_env import SubprocVecEnv
 
 import gym_rl_mpc
 from gym_rl_mpc import reporting
+from gym_rl_mpc.envs.shared_memory_vec_env import SharedMemoryVecEnv
+from gym_rl_mpc.envs.vec_turbine_env import VecTurbineEnv
+from gym_rl_mpc.utils.async_ppo import AsyncPPO
+from gym_rl_mpc.utils.history import iter_spilled_histories
 
 def linear_schedule(initial_value):
     """
@@ -54,22 +56,16 @@ class ReportingCallback(BaseCallback):
         super(ReportingCallback, self).__init__(verbose)
         self.report_dir = report_dir
         self.verbose = verbose
+        self.writer = reporting.ReportWriter(report_dir)
 
     def _on_step(self) -> bool:
-        # check if env is done, if yes report it to csv file
+        # check if env is done, if yes buffer its history for the report file
         done_array = np.array(self.locals.get("done") if self.locals.get("done") is not None else self.locals.get("dones"))
         if np.sum(done_array).item() > 0:
-            env_histories = self.training_env.get_attr('history')
-
-            class Struct(object): pass
-            report_env = Struct()
-            report_env.history = []
+            infos = self.locals.get("infos")
             for env_idx in range(len(done_array)):
-                if done_array[env_idx]:
-                    report_env.history.append(env_histories[env_idx])
-
-            reporting.report(env=report_env, report_dir=self.report_dir)
-
+                if done_array[env_idx] and 'episode_history' in infos[env_idx]:
+                    self.writer.add(infos[env_idx]['episode_history'])
 
         return True
 
@@ -77,28 +73,23 @@ class ReportingCallback(BaseCallback):
         """
         This event is triggered before exiting the `learn()` method.
         """
+        self.writer.close()
         vec_env = self.training_env
-        env_histories = vec_env.get_attr('total_history')
-        class Struct(object): pass
-        report_env = Struct()
-        report_env.history = []
-        for episode in range(max(map(len, env_histories))):
-            for env_idx in range(len(env_histories)):
-                if (episode < len(env_histories[env_idx])):
-                    report_env.history.append(env_histories[env_idx][episode])
-
-        if len(report_env.history) > 0:
-            training_data = reporting.format_history(report_env, lastn=100)
-            reporting.make_summary_file(training_data, self.report_dir, len(report_env.history))
-            if self.verbose:
-                print("Made summary file of training")
-
-            total_history_data = reporting.format_history(report_env)
-            os.makedirs(self.report_dir, exist_ok=True)
-            file_path = os.path.join(self.report_dir, "total_history_data.csv")
-            total_history_data.to_csv(file_path)
-            if self.verbose:
-                print("Made total history file of training")
+        spill_dir = vec_env.get_attr('config', indices=0)[0]['history_spill_dir']
+        if spill_dir is not None:
+            # The envs keep only their latest episodes, the summary is made in one pass over the spill files
+            vec_env.env_method('spill_history')
+            histories = iter_spilled_histories(spill_dir)
+        else:
+            env_histories = vec_env.get_attr('total_history')
+            histories = []
+            for episode in range(max(map(len, env_histories))):
+                for env_idx in range(len(env_histories)):
+                    if (episode < len(env_histories[env_idx])):
+                        histories.append(env_histories[env_idx][episode])
+
+        if reporting.report_total_history(histories, self.report_dir, lastn=100) > 0 and self.verbose:
+            print("Made summary file and total history file of training")
 
 class TensorboardCallback(BaseCallback):
     """
@@ -107,30 +98,37 @@ class TensorboardCallback(BaseCallback):
 
     def __init__(self, verbose=0):
         self.start_time = time()
+        self.num_episodes = 0
         super(TensorboardCallback, self).__init__(verbose)
 
+    def _on_training_start(self) -> None:
+        # Every env starts its first episode at the first reset
+        self.num_episodes = self.training_env.num_envs
+
     def _on_step(self) -> bool:
         done_array = np.array(self.locals.get("done") if self.locals.get("done") is not None else self.locals.get("dones"))
 
         if np.sum(done_array).item():
-            history = self.training_env.get_attr('history')
+            infos = self.locals.get("infos")
 
             for env_idx in range(len(done_array)):
                 if done_array[env_idx]:
-                    self.logger.record_mean('custom/crashed', history[env_idx]['crashed'])
-                    self.logger.record_mean('custom/psf_error', history[env_idx]['psf_error'])
-                    self.logger.record_mean('custom/wind_speed', history[env_idx]['wind_speed'])
-                    self.logger.record_mean('custom/theta_reward', history[env_idx]['theta_reward'])
-                    self.logger.record_mean('custom/theta_dot_reward', history[env_idx]['theta_dot_reward'])
-                    self.logger.record_mean('custom/omega_reward', history[env_idx]['omega_reward'])
-                    self.logger.record_mean('custom/omega_dot_reward', history[env_idx]['omega_dot_reward'])
-                    self.logger.record_mean('custom/power_reward', history[env_idx]['power_reward'])
-                    self.logger.record_mean('custom/psf_reward', history[env_idx]['psf_reward'])
+                    self.num_episodes += 1
+                    history = infos[env_idx].get('episode_history')
+                    if history is None:
+                        continue
+                    self.logger.record_mean('custom/crashed', history['crashed'])
+                    self.logger.record_mean('custom/psf_error', history['psf_error'])
+                    self.logger.record_mean('custom/wind_speed', history['wind_speed'])
+                    self.logger.record_mean('custom/theta_reward', history['theta_reward'])
+                    self.logger.record_mean('custom/theta_dot_reward', history['theta_dot_reward'])
+                    self.logger.record_mean('custom/omega_reward', history['omega_reward'])
+                    self.logger.record_mean('custom/omega_dot_reward', history['omega_dot_reward'])
+                    self.logger.record_mean('custom/power_reward', history['power_reward'])
+                    self.logger.record_mean('custom/psf_reward', history['psf_reward'])
 
         self.logger.record("time/custom_time_elapsed", int(time() - self.start_time))
-        episodesList = np.array(self.training_env.get_attr('episode'))
-        num_episodes = np.sum(episodesList)
-        self.logger.record("time/num_episodes", num_episodes)
+        self.logger.record("time/num_episodes", self.num_episodes)
 
         return True
 
@@ -194,12 +192,25 @@ if __name__ == '__main__':
         default=None,
         help='upper bound omega'
     )
+    parser.add_argument(
+        '--env_batch_size',
+        type=int,
+        default=None,
+        help='With psf, step the envs asynchronously and act on the first env_batch_size envs done with their step'
+    )
     args = parser.parse_args()
 
     NUM_CPUs = multiprocessing.cpu_count() if not args.num_cpus else args.num_cpus
 
-    # Make environment (NUM_CPUs parallel envs)
     env_id = args.env
+    # Define necessary directories
+    EXPERIMENT_ID = str(int(time())) + 'ppo'
+    agents_dir = os.path.join('logs', env_id, EXPERIMENT_ID, 'agents')
+    os.makedirs(agents_dir, exist_ok=True)
+    report_dir = os.path.join('logs', env_id, EXPERIMENT_ID, 'training_report')
+    tensorboard_log = os.path.join('logs', env_id, EXPERIMENT_ID, 'tensorboard')
+
+    # Make environment (NUM_CPUs parallel envs)
     customconfig = gym_rl_mpc.SCENARIOS[args.env]['config'].copy()
     if args.psf_lb_omega:
         customconfig['psf_lb_omega'] = args.psf_lb_omega
@@ -207,21 +218,23 @@ if __name__ == '__main__':
         customconfig['psf_ub_omega'] = args.psf_ub_omega
     if args.psf_T:
         customconfig['psf_T'] = args.psf_T
+    # The training report only uses the episode averages
+    customconfig['recording_level'] = 'summary'
+    # Episodes older than the latest history_length of each env are spilled to disk for the end of training summary
+    customconfig['history_spill_dir'] = os.path.join(report_dir, 'history_spill')
     if args.psf:
         customconfig['use_psf'] = True
         print("Using PSF corrected actions")
 
     env_kwargs = {'env_config': customconfig}
 
-    env = make_vec_env(env_id, n_envs=NUM_CPUs, vec_env_cls=SubprocVecEnv, env_kwargs=env_kwargs)
-
+    if customconfig['use_psf']:
+        # Every env keeps its PSF solver in its own process, the step data is exchanged through shared memory
+        env = make_vec_env(env_id, n_envs=NUM_CPUs, vec_env_cls=SharedMemoryVecEnv, env_kwargs=env_kwargs)
+    else:
+        # Without the PSF all envs are stepped on arrays in this process
+        env = VecTurbineEnv(env_id, n_envs=NUM_CPUs, env_config=customconfig)
 
-    # Define necessary directories
-    EXPERIMENT_ID = str(int(time())) + 'ppo'
-    agents_dir = os.path.join('logs', env_id, EXPERIMENT_ID, 'agents')
-    os.makedirs(agents_dir, exist_ok=True)
-    report_dir = os.path.join('logs', env_id, EXPERIMENT_ID, 'training_report')
-    tensorboard_log = os.path.join('logs', env_id, EXPERIMENT_ID, 'tensorboard')
 
     # Write note and config to Note.txt file
     with open(os.path.join('logs', env_id, EXPERIMENT_ID, "Note.txt"), "a") as file_object:
@@ -235,8 +248,12 @@ if __name__ == '__main__':
         if args.note:
             file_object.write(args.note)
 
-    # Callback to save model at checkpoints during training
-    checkpoint_callback = CheckpointCallback(save_freq=10000, save_path=agents_dir)
+    # Callback to save model at checkpoints during training, every 10000 * NUM_CPUs timesteps.
+    # save_freq counts callback steps, which AsyncPPO makes once per env_batch_size envs instead of NUM_CPUs
+    save_freq = 10000
+    if customconfig['use_psf'] and args.env_batch_size is not None:
+        save_freq = max(save_freq * NUM_CPUs // args.env_batch_size, 1)
+    checkpoint_callback = CheckpointCallback(save_freq=save_freq, save_path=agents_dir)
     # Callback to report training to file
     reporting_callback = ReportingCallback(report_dir=report_dir, verbose=True)
     # Callback to report additional values to tensorboard
@@ -247,10 +264,13 @@ if __name__ == '__main__':
     else:
         callback = CallbackList([checkpoint_callback, reporting_callback, tensorboard_callback])
 
+    # AsyncPPO collects the rollouts like PPO unless env_batch_size is set
     if (args.agent is not None):
-        agent = PPO.load(args.agent, env=env, verbose=True, tensorboard_log=tensorboard_log)
+        agent = AsyncPPO.load(args.agent, env=env, verbose=True, tensorboard_log=tensorboard_log,
+                              env_batch_size=args.env_batch_size)
     else:
-        agent = PPO('MlpPolicy', env, verbose=True, tensorboard_log=tensorboard_log, **hyperparams)
+        agent = AsyncPPO('MlpPolicy', env, verbose=True, tensorboard_log=tensorboard_log,
+                         env_batch_size=args.env_batch_size, **hyperparams)
 
     agent.learn(total_timesteps=args.timesteps, callback=callback)
 
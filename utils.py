@@ -39,23 +39,23 @@ def simulate_episode(env, agent, max_time, verbose=False, id=None):
             report_msg = '{:<20}{:<20}{:<20.2f}{:<20.2%}\r'.format(id, env.t_step, env.cumulative_reward, env.t_step*env.step_size/max_time)
             sys.stdout.write(report_msg)
             sys.stdout.flush()
-    time = np.array(env.episode_history['time']).reshape((env.t_step, 1))
-    last_reward = np.array(env.episode_history['last_reward']).reshape((env.t_step, 1))
-    theta_reward = np.array(env.episode_history['theta_reward']).reshape((env.t_step, 1))
-    theta_dot_reward = np.array(env.episode_history['theta_dot_reward']).reshape((env.t_step, 1))
-    omega_reward = np.array(env.episode_history['omega_reward']).reshape((env.t_step, 1))
-    omega_dot_reward = np.array(env.episode_history['omega_dot_reward']).reshape((env.t_step, 1))
-    power_reward = np.array(env.episode_history['power_reward']).reshape((env.t_step, 1))
-    psf_reward = np.array(env.episode_history['psf_reward']).reshape((env.t_step, 1))
+    time = np.array(env.episode_history['time']).reshape((-1, 1))
+    last_reward = np.array(env.episode_history['last_reward']).reshape((-1, 1))
+    theta_reward = np.array(env.episode_history['theta_reward']).reshape((-1, 1))
+    theta_dot_reward = np.array(env.episode_history['theta_dot_reward']).reshape((-1, 1))
+    omega_reward = np.array(env.episode_history['omega_reward']).reshape((-1, 1))
+    omega_dot_reward = np.array(env.episode_history['omega_dot_reward']).reshape((-1, 1))
+    power_reward = np.array(env.episode_history['power_reward']).reshape((-1, 1))
+    psf_reward = np.array(env.episode_history['psf_reward']).reshape((-1, 1))
     states = env.episode_history['states']
     input = env.episode_history['input']
     agent_actions = env.episode_history['agent_actions']
     psf_actions = env.episode_history['psf_actions']
-    wind_force = np.array(env.episode_history['wind_force']).reshape((env.t_step, 1))
-    wind_torque = np.array(env.episode_history['wind_torque']).reshape((env.t_step, 1))
-    generator_torque = np.array(env.episode_history['generator_torque']).reshape((env.t_step, 1))
-    wind_speed = np.array(env.episode_history['wind_speed']).reshape((env.t_step, 1))
-    adjusted_wind_speed = np.array(env.episode_history['adjusted_wind_speed']).reshape((env.t_step, 1))
+    wind_force = np.array(env.episode_history['wind_force']).reshape((-1, 1))
+    wind_torque = np.array(env.episode_history['wind_torque']).reshape((-1, 1))
+    generator_torque = np.array(env.episode_history['generator_torque']).reshape((-1, 1))
+    wind_speed = np.array(env.episode_history['wind_speed']).reshape((-1, 1))
+    adjusted_wind_speed = np.array(env.episode_history['adjusted_wind_speed']).reshape((-1, 1))
 
     sim_data = np.hstack([  time,
                             states,